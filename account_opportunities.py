@@ -0,0 +1,45 @@
+from opportunity_details import soql_id
+from opportunity_picker import MAX_PAGE_SIZE, MIN_PAGE_SIZE, PickerPage
+
+# Deal count and total Amount per stage of the Account's other Opportunities, aggregated by Salesforce
+STAGE_SUMMARY_QUERY = """
+SELECT StageName, COUNT(Id) deals, SUM(Amount) amount
+FROM Opportunity
+WHERE AccountId = '{account_id}' AND Id != '{opportunity_id}'
+GROUP BY StageName
+"""
+
+# The Account's other Opportunities, latest close date first
+ACCOUNT_OPPORTUNITIES_QUERY = """
+SELECT Id, Name, CloseDate, StageName, Amount
+FROM Opportunity
+WHERE AccountId = '{account_id}' AND Id != '{opportunity_id}'
+ORDER BY CloseDate DESC NULLS LAST, Id
+"""
+
+
+def stage_summary(connection, account_id, opportunity_id):
+    """Return ``{"StageName", "deals", "amount"}`` rows for the Account's other Opportunities, biggest stage first."""
+    soql = STAGE_SUMMARY_QUERY.format(account_id=soql_id(account_id), opportunity_id=soql_id(opportunity_id))
+    rows = [
+        {"StageName": record.get("StageName"), "deals": record.get("deals") or 0, "amount": record.get("amount")}
+        for record in connection.query(soql).get("records", [])
+    ]
+    return sorted(rows, key=lambda row: row["deals"], reverse=True)
+
+
+def fetch_account_opportunities_page(connection, account_id, opportunity_id, cursor=None, page_size=MIN_PAGE_SIZE):
+    """Fetch one page of the Account's other Opportunities, following ``cursor`` like the picker does."""
+    page_size = max(MIN_PAGE_SIZE, min(page_size, MAX_PAGE_SIZE))
+    headers = {"Sforce-Query-Options": f"batchSize={page_size}"}
+    if cursor is None:
+        soql = ACCOUNT_OPPORTUNITIES_QUERY.format(account_id=soql_id(account_id),
+                                                  opportunity_id=soql_id(opportunity_id))
+        result = connection.query(soql, headers=headers)
+    else:
+        result = connection.query_more(cursor, headers=headers)
+    return PickerPage(
+        records=result.get("records", []),
+        next_records_url=None if result.get("done", True) else result.get("nextRecordsUrl"),
+        total_size=result.get("totalSize", 0),
+    )
@@ -0,0 +1,206 @@
+import contextvars
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_call_context = contextvars.ContextVar("salesforce_call_context", default=("unknown", "unknown"))
+
+_ID_SEGMENT = re.compile(r"^[a-zA-Z0-9]{15}(?:[a-zA-Z0-9]{3})?$|^[a-zA-Z0-9]{15,18}-\d+$")
+_LIMIT_INFO = re.compile(r"api-usage=(\d+)/(\d+)")
+
+
+@contextmanager
+def api_call_context(page, session):
+    """Attribute the Salesforce calls made inside the block to ``page`` and ``session``."""
+    token = _call_context.set((page, session))
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def current_call_context():
+    """The ``(page, session)`` the Salesforce calls made now are attributed to."""
+    return _call_context.get()
+
+
+def operation_name(method, url):
+    # "GET sobjects/Opportunity/{id}" style names, so record Ids don't explode the label set
+    path = urlparse(url).path
+    path = re.sub(r"^/services/data/v[\d.]+/", "", path)
+    path = re.sub(r"^/services/Soap/u/[\d.]+", "login", path)
+    segments = ["{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.strip("/").split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+@dataclass
+class _Series:
+    count: int = 0
+    errors: int = 0
+    latency_sum: float = 0.0
+    bytes: int = 0
+    deduplicated: int = 0
+    buckets: list = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def observe(self, latency, payload_bytes, error):
+        self.count += 1
+        self.errors += error
+        self.latency_sum += latency
+        self.bytes += payload_bytes
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+
+class ApiMetrics:
+    """Call count, latency histogram and payload size of every Salesforce HTTP request.
+
+    Register ``response_hook`` on the ``requests.Session`` used for Salesforce; each
+    response is attributed to the page and session set with ``api_call_context``. The
+    org's API usage is read from the ``Sforce-Limit-Info`` header of the responses.
+    ``deduplication_hook`` counts the calls that shared another session's request.
+
+    Process totals are kept per page and operation. Per-session detail is only kept for
+    the ``max_sessions`` most recently active sessions, so it doesn't grow with every
+    browser session the server has seen.
+    """
+
+    def __init__(self, max_events=10000, max_sessions=1000):
+        self._lock = threading.Lock()
+        self._series = {}  # (page, operation) -> _Series
+        self._sessions = OrderedDict()  # session -> {(page, operation): _Series}, least recently active first
+        self.max_sessions = max_sessions
+        self._events = deque(maxlen=max_events)
+        self.api_used = None
+        self.api_limit = None
+
+    def response_hook(self, response, *args, **kwargs):
+        page, session = _call_context.get()
+        operation = operation_name(response.request.method, response.url)
+        # Hooks run before requests reads the body and ``elapsed`` stops at the headers,
+        # so the download of the body is timed here and added
+        started = time.perf_counter()
+        payload_bytes = len(response.content or b"")
+        latency = response.elapsed.total_seconds() + time.perf_counter() - started
+        error = response.status_code >= 400
+        limit_match = _LIMIT_INFO.search(response.headers.get("Sforce-Limit-Info", ""))
+
+        with self._lock:
+            for series in self._series_for(page, session, operation):
+                series.observe(latency, payload_bytes, error)
+            if limit_match:
+                self.api_used, self.api_limit = int(limit_match.group(1)), int(limit_match.group(2))
+            self._events.append({
+                "timestamp": time.time(),
+                "page": page,
+                "session": session,
+                "operation": operation,
+                "status": response.status_code,
+                "latency_seconds": round(latency, 4),
+                "bytes": payload_bytes,
+                "api_used": self.api_used,
+                "api_limit": self.api_limit,
+            })
+
+    def deduplication_hook(self, operation):
+        page, session = _call_context.get()
+        with self._lock:
+            for series in self._series_for(page, session, operation):
+                series.deduplicated += 1
+
+    def _series_for(self, page, session, operation):
+        # The process-wide series and the session's own; call with the lock held
+        session_series = self._sessions.pop(session, None) or {}
+        self._sessions[session] = session_series
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        key = (page, operation)
+        return self._series.setdefault(key, _Series()), session_series.setdefault(key, _Series())
+
+    def summary(self, session=None):
+        """Totals per (page, operation), optionally only for one session."""
+        rows = {}
+        with self._lock:
+            series_items = self._series if session is None else self._sessions.get(session, {})
+            for (page, operation), series in series_items.items():
+                row = rows.setdefault((page, operation), {
+                    "page": page, "operation": operation, "calls": 0, "deduplicated": 0, "errors": 0,
+                    "latency_sum": 0.0, "bytes": 0,
+                })
+                row["calls"] += series.count
+                row["deduplicated"] += series.deduplicated
+                row["errors"] += series.errors
+                row["latency_sum"] += series.latency_sum
+                row["bytes"] += series.bytes
+        for row in rows.values():
+            # Rows of calls that were all deduplicated have no latency of their own
+            latency_sum = row.pop("latency_sum")
+            row["mean_latency_ms"] = 1000 * latency_sum / row["calls"] if row["calls"] else None
+        return sorted(rows.values(), key=lambda row: (row["page"], -row["calls"]))
+
+    def to_prometheus(self):
+        """Render all series in the Prometheus text exposition format."""
+        with self._lock:
+            series_items = sorted(
+                (key, _Series(s.count, s.errors, s.latency_sum, s.bytes, s.deduplicated, list(s.buckets)))
+                for key, s in self._series.items()
+            )
+            api_used, api_limit = self.api_used, self.api_limit
+
+        # No session label: every browser session would be a new series
+        def labels(page, operation):
+            return f'page="{_escape(page)}",operation="{_escape(operation)}"'
+
+        lines = []
+        for name, kind, help_text, value in (
+            ("salesforce_api_requests_total", "counter", "Salesforce API requests.", lambda s: s.count),
+            ("salesforce_api_errors_total", "counter",
+             "Salesforce API requests that returned an HTTP error.", lambda s: s.errors),
+            ("salesforce_api_response_bytes_total", "counter",
+             "Bytes received from the Salesforce API.", lambda s: s.bytes),
+            ("salesforce_api_deduplicated_total", "counter",
+             "Salesforce API calls served by an identical request already in flight.", lambda s: s.deduplicated),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{{{labels(*key)}}} {value(series)}" for key, series in series_items]
+
+        name = "salesforce_api_request_duration_seconds"
+        lines += [f"# HELP {name} Salesforce API request latency.", f"# TYPE {name} histogram"]
+        for key, series in series_items:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), series.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels(*key)},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels(*key)}}} {series.latency_sum}")
+            lines.append(f"{name}_count{{{labels(*key)}}} {series.count}")
+
+        if api_limit is not None:
+            lines += [
+                "# HELP salesforce_org_api_requests_used API requests used in the org's rolling 24 hours.",
+                "# TYPE salesforce_org_api_requests_used gauge",
+                f"salesforce_org_api_requests_used {api_used}",
+                "# HELP salesforce_org_api_requests_limit Daily API request limit of the org.",
+                "# TYPE salesforce_org_api_requests_limit gauge",
+                f"salesforce_org_api_requests_limit {api_limit}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self):
+        # One JSON object per recorded request, oldest first
+        with self._lock:
+            return "".join(json.dumps(event) + "\n" for event in self._events)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,210 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from api_metrics import current_call_context
+
+logger = logging.getLogger(__name__)
+
+# Error codes Salesforce answers with while it's over a limit or briefly unavailable
+TRANSIENT_ERROR_CODES = {"REQUEST_LIMIT_EXCEEDED", "SERVER_UNAVAILABLE", "UNABLE_TO_LOCK_ROW"}
+TRANSIENT_STATUSES = {502, 503, 504}
+
+_max_wait = contextvars.ContextVar("api_scheduler_max_wait", default=None)
+
+
+class ApiOverloaded(Exception):
+    """The call was shed: Salesforce is over its limits or the scheduler's budgets are used up."""
+
+
+@contextmanager
+def wait_for_budget(max_wait=float("inf")):
+    """Let the calls made inside the block wait up to ``max_wait`` seconds for budget instead of being shed.
+
+    For background work like the snapshot sync, which should slow down rather than fail.
+    """
+    token = _max_wait.set(max_wait)
+    try:
+        yield
+    finally:
+        _max_wait.reset(token)
+
+
+def _error_codes(error):
+    # simple_salesforce errors carry the parsed response, a list of {"errorCode", "message"}
+    content = getattr(error, "content", None)
+    if not isinstance(content, list):
+        return []
+    return [(item.get("errorCode"), item.get("message") or "") for item in content if isinstance(item, dict)]
+
+
+def is_limit_error(error):
+    return any(code == "REQUEST_LIMIT_EXCEEDED" for code, _ in _error_codes(error))
+
+
+def is_daily_limit_error(error):
+    # The org's rolling 24 hour allowance is used up; retrying within minutes won't help
+    return any(code == "REQUEST_LIMIT_EXCEEDED" and "TotalRequests" in message
+               for code, message in _error_codes(error))
+
+
+def is_transient(error):
+    """Whether ``error`` is worth retrying: limits, 5xx gateways or a dropped connection."""
+    if getattr(error, "status", None) in TRANSIENT_STATUSES:
+        return True
+    if any(code in TRANSIENT_ERROR_CODES for code, _ in _error_codes(error)):
+        return not is_daily_limit_error(error)
+    # requests' connection errors and timeouts derive from OSError
+    return isinstance(error, OSError)
+
+
+class TokenBucket:
+    """Allows ``rate_per_minute`` calls on average with bursts of up to ``burst`` calls."""
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        # ``now`` may predate a bucket created after it was read; that mustn't take tokens away
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        # Seconds until a whole token is available
+        self.refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class ApiScheduler:
+    """Admission control in front of every Salesforce call of the process.
+
+    A call needs a token from the global bucket and from its user's bucket (the browser
+    session set with ``api_call_context``) and one of ``max_concurrent`` slots. Calls that
+    fail with a transient error are retried with jittered exponential backoff, and a
+    ``REQUEST_LIMIT_EXCEEDED`` error pauses all calls for the backoff delay, so the
+    process backs off as a whole. A call that can't start within ``max_wait`` seconds,
+    or still fails after ``max_retries`` retries, raises ``ApiOverloaded`` so the page can
+    fall back to cached data.
+    """
+
+    def __init__(self, max_concurrent=8, calls_per_minute=600, burst=200, user_calls_per_minute=120,
+                 user_burst=60, max_wait=5, max_retries=3, base_delay=0.5, max_delay=8, max_users=1000):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_users = max_users
+        self.user_calls_per_minute = user_calls_per_minute
+        self.user_burst = user_burst
+        self._condition = threading.Condition()
+        self._global = TokenBucket(calls_per_minute, burst)
+        self._users = {}
+        self._running = 0
+        self._paused_until = 0.0
+        self.waiting = 0
+        self.retries = 0
+        self.shed = 0
+
+    def run(self, operation, user=None, retry=True):
+        """Run ``operation()`` once admitted, retrying transient errors unless ``retry`` is False.
+
+        Calls that may change data must not be retried: a dropped connection or a 503
+        doesn't tell whether Salesforce ran them.
+        """
+        if user is None:
+            user = current_call_context()[1]
+        max_wait = _max_wait.get()
+        for attempt in range(self.max_retries + 1):
+            self._acquire(user, self.max_wait if max_wait is None else max_wait)
+            try:
+                return operation()
+            except Exception as e:
+                error = e
+            finally:
+                self._release()
+
+            if is_daily_limit_error(error):
+                self._pause(self.max_delay)
+                self._shed(f"Salesforce's daily API limit is used up: {error}", error)
+            if not retry or not is_transient(error):
+                raise error
+            if attempt == self.max_retries:
+                self._shed(f"Salesforce is still unavailable after {attempt + 1} attempts: {error}", error)
+            # Full jitter keeps sessions that failed together from retrying together
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            logger.info("Retrying a Salesforce call in %.2f s after %s", delay, error)
+            with self._condition:
+                self.retries += 1
+            if is_limit_error(error):
+                self._pause(delay)  # Over a limit: every caller backs off, not just this one
+            time.sleep(delay)
+
+    def _user_bucket(self, user):
+        bucket = self._users.get(user)
+        if bucket is None:
+            if len(self._users) >= self.max_users:
+                # Buckets that refilled completely are the same as new ones, so they can go
+                now = time.monotonic()
+                for name, idle in list(self._users.items()):
+                    if idle.wait_time(now) == 0 and idle.tokens >= idle.burst:
+                        del self._users[name]
+            bucket = self._users[user] = TokenBucket(self.user_calls_per_minute, self.user_burst)
+        return bucket
+
+    def _acquire(self, user, max_wait):
+        deadline = time.monotonic() + max_wait
+        with self._condition:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket = self._user_bucket(user)
+                    wait = max(self._paused_until - now, self._global.wait_time(now), bucket.wait_time(now))
+                    if wait == 0 and self._running < self.max_concurrent:
+                        self._global.tokens -= 1
+                        bucket.tokens -= 1
+                        self._running += 1
+                        return
+                    # Shed right away when the budget can't allow the call before the deadline
+                    if now + (wait or 0.05) > deadline:
+                        self.shed += 1
+                        raise ApiOverloaded("Too many Salesforce calls right now")
+                    # Without a free slot, _release() and _pause() notify
+                    self._condition.wait(min(wait or 1.0, deadline - now))
+            finally:
+                self.waiting -= 1
+
+    def _release(self):
+        # Callers wait for different things (a slot, their own tokens, the end of a pause),
+        # so all of them check again; a single notify could wake one that still can't run
+        with self._condition:
+            self._running -= 1
+            self._condition.notify_all()
+
+    def _pause(self, delay):
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._condition.notify_all()
+
+    def _shed(self, message, error):
+        with self._condition:
+            self.shed += 1
+        raise ApiOverloaded(message) from error
+
+    def stats(self):
+        with self._condition:
+            return {
+                "running": self._running,
+                "waiting": self.waiting,
+                "retries": self.retries,
+                "shed": self.shed,
+                "paused_seconds": max(self._paused_until - time.monotonic(), 0.0),
+            }
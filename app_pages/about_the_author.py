@@ -0,0 +1,29 @@
+import streamlit as st
+
+
+# About the Author Page
+def about_the_author():
+    st.title("About the Author :male-student:")
+
+    # Use icons as images
+    st.markdown("""
+    Hi, I'm Kornel Pudło, a Data Engineer  with a passion for building impactful applications and sharing knowledge. 
+    The Salesforce Opportunities Viewer App is a powerful tool designed for sales teams to streamline deal management and improve decision-making.
+    By integrating directly with Salesforce, the app provides a detailed overview of opportunities, account details, and related activities.
+    Feel free to connect and share your feedback with me! 😊
+
+    You can find more about my work at the following links [click the icon]:
+
+    - **Check out the code:**  
+      [![GitHub](https://img.icons8.com/ios-glyphs/30/000000/github.png)](https://github.com/KornelPudlo) GitHub  
+    
+    - **Let’s connect here:**  
+      [![LinkedIn](https://img.icons8.com/ios-filled/30/000000/linkedin.png)](https://www.linkedin.com/in/kornel-pud%C5%82o-a19921b5) LinkedIn  
+    
+    - **Read the full story:**  
+      [![Medium](https://img.icons8.com/ios-glyphs/30/000000/medium-monogram.png)](https://medium.com/@korn.pudlo) Medium  
+      
+    """, unsafe_allow_html=True)
+
+
+about_the_author()
@@ -0,0 +1,411 @@
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+from simple_salesforce.exceptions import SalesforceError
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from account_opportunities import fetch_account_opportunities_page, stage_summary
+from api_scheduler import ApiOverloaded
+from app_resources import (get_record_cache, get_resource_catalog, get_salesforce_connection, get_snapshot_store,
+                           snapshot_sidebar, start_snapshot_sync)
+from opportunity_details import load_opportunity_details
+from opportunity_picker import PickerFilters, fetch_picker_page, picker_label, picklist_values
+from prefetcher import Prefetcher, prefetch_candidates
+from risk_scoring import risk_analysis, score_pipeline
+from snapshot_store import SnapshotStore
+
+
+def show_cache_statistics(cache, prefetcher=None):
+    stats = cache.stats()
+    with st.sidebar.expander("Cache statistics"):
+        st.write(f"**Entries:** {stats['entries']} ({stats['bytes'] / 1024:,.0f} KiB of {stats['max_bytes'] / 1024:,.0f} KiB)")
+        st.write(f"**Hits / Misses:** {stats['hits']} / {stats['misses']} ({stats['hit_rate']:.0%} hit rate)")
+        st.write(f"**Revalidations:** {stats['revalidations']}")
+        st.write(f"**Evictions:** {stats['evictions']}")
+        if prefetcher:
+            st.write(f"**Prefetched:** {prefetcher.prefetched} ({prefetcher.calls_last_minute()} of "
+                     f"{prefetcher.calls_per_minute} API calls in the last minute)")
+
+
+# Background prefetcher of this browser session, or None when disabled with calls_per_minute = 0
+def get_prefetcher(connection):
+    settings = st.secrets.get("prefetch", {})
+    if not settings.get("calls_per_minute", 30):
+        return None
+    if "prefetcher" not in st.session_state:
+        st.session_state.prefetcher = Prefetcher(
+            connection, get_record_cache(),
+            calls_per_minute=settings.get("calls_per_minute", 30),
+            session=get_script_run_ctx().session_id,
+        )
+    return st.session_state.prefetcher
+
+
+# Warm the deals the rep is likely to open next: picker neighbours, then listed sibling deals
+def schedule_prefetch(prefetcher, details):
+    state = st.session_state
+    picker_records = state.picker_pages[state.picker_page_index].records
+    siblings = []
+    if state.get("account_opportunities_for", (None,))[0] == details.account_id:
+        siblings = [record for page in state.account_opportunities_pages for record in page.records]
+    neighbors = st.secrets.get("prefetch", {}).get("neighbors", 2)
+    prefetcher.schedule(prefetch_candidates(details.id, picker_records, siblings, neighbors=neighbors))
+
+
+# Picklist values for the picker filters, refreshed hourly
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_opportunity_picklists(_connection):
+    describe_result = _connection.describe("Opportunity")
+    return {name: picklist_values(describe_result, name) for name in ("StageName", "Region__c", "Segment__c")}
+
+
+def _fetch_picker_page(source, filters, cursor=None):
+    if isinstance(source, SnapshotStore):
+        return source.fetch_picker_page(filters, cursor=cursor)
+    return fetch_picker_page(source, filters, cursor=cursor)
+
+
+def _next_picker_page():
+    state = st.session_state
+    pages = state.picker_pages
+    if state.picker_page_index + 1 == len(pages):
+        try:
+            pages.append(_fetch_picker_page(state.picker_source, state.picker_filters,
+                                            cursor=pages[-1].next_records_url))
+        except SalesforceError:
+            # Query cursors expire after about 15 minutes of inactivity, so start over
+            state.picker_filters = None
+            return
+        except ApiOverloaded:
+            st.toast("Salesforce is busy, please try the next page again in a moment")
+            return
+    state.picker_page_index += 1
+
+
+def _previous_picker_page():
+    st.session_state.picker_page_index -= 1
+
+
+# Searchable, paginated Opportunity picker returning the selected Opportunity Id
+def opportunity_picker(connection, store=None):
+    picklists = store.picklists() if store else get_opportunity_picklists(connection)
+
+    search = st.text_input("Search Opportunities by name")
+    stage_col, region_col, segment_col, owner_col = st.columns(4)
+    stage = stage_col.selectbox("Stage", [None] + picklists["StageName"], format_func=lambda v: v or "All")
+    region = region_col.selectbox("Region", [None] + picklists["Region__c"], format_func=lambda v: v or "All")
+    segment = segment_col.selectbox("Segment", [None] + picklists["Segment__c"], format_func=lambda v: v or "All")
+    owner = owner_col.text_input("Owner")
+    filters = PickerFilters(search=search, stage=stage, region=region, segment=segment, owner=owner)
+
+    # Pages already fetched are kept per session; a filter or source change starts over from the first page
+    source = store or connection
+    state = st.session_state
+    if state.get("picker_filters") != filters or state.get("picker_source") is not source:
+        try:
+            first_page = _fetch_picker_page(source, filters)
+        except ApiOverloaded:
+            if "picker_pages" not in state:
+                raise
+            # Keep listing the previous results; the new filters are tried again on the next rerun
+            st.warning("Salesforce is busy, so these are the results of the previous filters.")
+        else:
+            state.picker_filters = filters
+            state.picker_source = source
+            state.picker_pages = [first_page]
+            state.picker_page_index = 0
+
+    page_index = state.picker_page_index
+    page = state.picker_pages[page_index]
+    if not page.records:
+        return None
+
+    # Key the options by Id so Opportunities with the same Name don't collide
+    labels = {opp["Id"]: picker_label(opp) for opp in page.records}
+    selected_opportunity_id = st.selectbox(
+        "Select an Opportunity",
+        options=list(labels.keys()),
+        format_func=labels.get
+    )
+
+    prev_col, info_col, next_col = st.columns([1, 4, 1])
+    prev_col.button("◀ Previous", disabled=page_index == 0, on_click=_previous_picker_page)
+    next_col.button("Next ▶", disabled=page.next_records_url is None, on_click=_next_picker_page)
+    info_col.caption(f"Page {page_index + 1} · {page.total_size:,} matching opportunities")
+
+    return selected_opportunity_id
+
+
+# Stage totals of an Account's other Opportunities, shared by all sessions for a few minutes
+@st.cache_data(ttl=300, show_spinner=False)
+def get_stage_summary(_connection, account_id, opportunity_id):
+    return stage_summary(_connection, account_id, opportunity_id)
+
+
+def _fetch_account_opportunities_page(source, account_id, opportunity_id, cursor=None):
+    if isinstance(source, SnapshotStore):
+        return source.fetch_account_opportunities_page(account_id, opportunity_id, cursor=cursor)
+    return fetch_account_opportunities_page(source, account_id, opportunity_id, cursor=cursor)
+
+
+def _load_more_account_opportunities():
+    state = st.session_state
+    pages = state.account_opportunities_pages
+    try:
+        pages.append(_fetch_account_opportunities_page(state.account_opportunities_source,
+                                                       *state.account_opportunities_for,
+                                                       cursor=pages[-1].next_records_url))
+    except SalesforceError:
+        # The query cursor expired, so start over from the first page
+        state.account_opportunities_for = None
+    except ApiOverloaded:
+        st.toast("Salesforce is busy, please try loading more again in a moment")
+
+
+# Other Opportunities of the Account: stage totals first, then the deals a page at a time
+def other_opportunities_panel(connection, store, details):
+    expander = st.expander(f"### Other Opportunities for {details.account_name}",
+                           key="other_opportunities", on_change="rerun")
+    if not expander.open:
+        return  # Nothing is queried until the panel is opened
+
+    with expander:
+        if details.account_id is None:
+            st.write("This opportunity isn't linked to an account.")
+            return
+
+        source = store or connection
+        ids = (details.account_id, details.id)
+        state = st.session_state
+        try:
+            summary = store.stage_summary(*ids) if store else get_stage_summary(connection, *ids)
+            if state.get("account_opportunities_for") != ids or state.get("account_opportunities_source") is not source:
+                state.account_opportunities_for = ids
+                state.account_opportunities_source = source
+                state.account_opportunities_pages = [_fetch_account_opportunities_page(source, *ids)]
+        except Exception as e:
+            st.warning(f"Other opportunities could not be loaded: {e}")
+            return
+
+        if not summary:
+            st.write("No other opportunities for this account.")
+            return
+
+        st.dataframe(
+            pd.DataFrame(summary),
+            hide_index=True,
+            column_config={
+                "StageName": "Stage",
+                "deals": st.column_config.NumberColumn("Deals"),
+                "amount": st.column_config.NumberColumn("Total Amount", format="dollar"),
+            },
+        )
+
+        # Pages loaded so far, shown in one scrollable grid
+        pages = state.account_opportunities_pages
+        records = [record for page in pages for record in page.records]
+        st.dataframe(
+            pd.DataFrame.from_records(records, columns=["Name", "CloseDate", "StageName", "Amount"]),
+            hide_index=True,
+            column_config={
+                "CloseDate": "Close Date",
+                "StageName": "Stage",
+                "Amount": st.column_config.NumberColumn("Amount", format="dollar"),
+            },
+        )
+        info_col, more_col = st.columns([4, 1])
+        info_col.caption(f"Showing {len(records):,} of {pages[-1].total_size:,} opportunities")
+        more_col.button("Load more", disabled=pages[-1].next_records_url is None,
+                        on_click=_load_more_account_opportunities)
+
+
+# Salesforce App Page
+def opportunities_viewer():
+    connection = get_salesforce_connection()
+    if connection.is_connected():
+        st.title("Salesforce Opportunities Viewer")
+        st.subheader("Select an Opportunity to View Details")
+
+        # Read from the local snapshot when one is configured and loaded
+        store = get_snapshot_store()
+        if store:
+            start_snapshot_sync(store, connection, st.secrets["snapshot"].get("sync_interval_minutes", 15))
+            store = snapshot_sidebar(store, connection)
+
+        try:
+            selected_opportunity_id = opportunity_picker(connection, store)
+            if selected_opportunity_id:
+                # Load the selected opportunity with its Account, Contacts and latest activity
+                if store:
+                    details = store.load_opportunity_details(selected_opportunity_id)
+                    st.caption("Loaded from the local snapshot")
+                else:
+                    cache = get_record_cache()
+                    details = load_opportunity_details(connection, selected_opportunity_id, cache=cache)
+                    show_cache_statistics(cache, get_prefetcher(connection))
+                    st.caption(f"Loaded with {details.api_calls} Salesforce API calls")
+                    if details.stale:
+                        st.warning("Salesforce is busy, so some details are cached data that may be out of date "
+                                   f"({', '.join(details.stale)}).")
+
+                # Extract Opportunity details
+                opportunity_name = details.name
+                close_date = details.close_date
+                stage_name = details.stage_name
+                amount = details.amount
+                segment = details.segment
+                region = details.region
+                probability = details.probability
+
+                # Extract Account details
+                account_name = details.account_name
+                account_number = details.account_number
+                industry = details.industry
+                customer_priority = details.customer_priority
+                account_type = details.account_type
+                rating = details.rating
+
+                # Use the first contact as the default for the Deal Accelerator section
+                primary_contact = details.primary_contact
+                contact_name = primary_contact.get('Name') or "N/A"
+                contact_email = primary_contact.get('Email') or "N/A"
+                contact_phone = primary_contact.get('Phone') or "N/A"
+                contact_title = primary_contact.get('Title') or "N/A"
+
+                # Layout: Opportunity Details and Account Details in two columns
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    st.subheader("Opportunity Details")
+                    st.write(f"**Name:** {opportunity_name}")
+                    st.write(f"**Close Date:** {close_date}")
+                    st.write(f"**Stage:** {stage_name}")
+                    st.write(f"**Amount:** ${amount:,}")
+                    st.write(f"**Segment:** {segment}")
+                    st.write(f"**Region:** {region}")
+
+                with col2:
+                    st.subheader("Account Details")
+                    st.write(f"**Name:** {account_name}")
+                    st.write(f"**Account Number:** {account_number}")
+                    st.write(f"**Industry:** {industry}")
+                    st.write(f"**Customer Priority:** {customer_priority}")
+                    st.write(f"**Type:** {account_type}")
+                    st.write(f"**Rating:** {rating}")
+
+                # Layout: Primary Contact Details and Recent Activity in two columns
+                col3, col4 = st.columns(2)
+
+                with col3:
+                    st.subheader("Primary Contact Details")
+                    if "account" in details.errors:
+                        st.warning(f"Contacts could not be loaded: {details.errors['account']}")
+                    st.write(f"**Name:** {contact_name}")
+                    st.write(f"**Title:** {contact_title}")
+                    st.write(f"**Email:** {contact_email}")
+                    st.write(f"**Phone:** {contact_phone}")
+
+                with col4:
+                    st.subheader("Recent Activity")
+                    recent_activity = details.recent_activity
+                    if "activity" in details.errors:
+                        st.warning(f"Recent activity could not be loaded: {details.errors['activity']}")
+                    elif recent_activity:
+                        activity_subject = recent_activity.get("Subject", "No Subject")
+                        activity_status = recent_activity.get("Status", "N/A")  # Tasks have Status; Events do not
+                        activity_date = recent_activity.get("ActivityDate", "No Date")
+                        activity_description = recent_activity.get("Description", "No Description")
+
+                        st.write(f"**Subject:** {activity_subject}")
+                        st.write(f"**Status:** {activity_status}")  # Will display "N/A" for Events
+                        st.write(f"**Date:** {activity_date}")
+                        st.write(f"**Description:** {activity_description}")
+                    else:
+                        st.write("No recent activities found for this opportunity.")
+
+                st.markdown("<div style='margin: 20px 0;'></div>", unsafe_allow_html=True)
+
+                # Display Other Opportunities as a dropdown, loaded only when opened
+                other_opportunities_panel(connection, store, details)
+
+                # Prefetch the likely next deals while the rep reads this one; a new selection replaces the queue
+                prefetcher = None if store else get_prefetcher(connection)
+                if prefetcher:
+                    schedule_prefetch(prefetcher, details)
+
+                st.markdown("<div style='margin: 20px 0;'></div>", unsafe_allow_html=True)
+
+                # Add Deal Accelerator Section
+                # Add Deal Accelerator Section
+                st.write("### Deal Accelerator")
+                st.markdown(
+                    f"""
+                    For the **{opportunity_name}**, the current win probability is **{probability}%**.
+                    To increase the chances of winning the deal, please:
+                    - **Contact:** {contact_name} ({contact_title})
+                      - **Email:** {contact_email}
+                      - **Phone:** {contact_phone}
+                    """
+                )
+
+                # Score the opportunity with the same engine as the Pipeline Risk page
+                scored = score_pipeline(pd.DataFrame([{
+                    "CloseDate": close_date, "StageName": stage_name, "Probability": probability, "Amount": amount
+                }])).iloc[0]
+
+                # Add Next Steps based on Stage
+                st.markdown(f"- **Next Step:** {scored['next_step']}")
+
+                # Add Risk Analysis
+                risk_message, action_suggestion, high_value_insight = risk_analysis(scored)
+                st.markdown(f"- **Risk Analysis:** {risk_message}")
+                st.markdown(f"- **Recommended Action:** {action_suggestion}")
+
+                if high_value_insight:
+                    st.markdown(f"- **Additional Insight:** {high_value_insight}")
+
+                # Add Stage-Specific Guidance
+                stage_guidance = {
+                    "Closed Won": "Focus on delivering exceptional results to ensure client satisfaction and secure potential future business or referrals.",
+                    "Perception Analysis": "Provide the client with success stories, testimonials, or ROI analyses to reinforce your value proposition.",
+                    "Negotiation/Review": "Address all objections and ensure alignment with decision-makers to finalize the deal terms.",
+                    "Id. Decision Makers": "Ensure you have identified and engaged all key stakeholders in the decision-making process.",
+                    "Qualification": "Validate the client's budget, timeline, and decision-making authority to move forward effectively.",
+                    "Value Proposition": "Clearly articulate how your solution uniquely meets the client's specific needs and challenges.",
+                    "Prospecting": "Research the client's business environment and challenges to establish meaningful initial engagement.",
+                    "Needs Analysis": "Conduct comprehensive discovery sessions to understand the client's pain points and goals fully.",
+                    "Proposal/Price Quote": "Craft a compelling proposal that highlights value over cost and addresses potential objections proactively."
+                }
+                guidance = stage_guidance.get(stage_name, "Continue to progress the deal.")
+                st.markdown(f"- **Guidance for {stage_name} Stage:** {guidance}")
+
+                # Add Recommended Resources based on Industry
+                industry_resources = get_resource_catalog().for_industry(industry)
+                if industry_resources:
+                    st.markdown("**Recommended Resources:**")
+                    for resource in industry_resources:
+                        # The file is only read when the button is clicked
+                        st.download_button(
+                            label=f"📄 Download {resource.name}",
+                            data=partial(get_resource_catalog().read, resource),
+                            file_name=resource.name,
+                            mime="application/pdf",
+                            key=f"resource-{resource.sha256}",
+                        )
+                else:
+                    st.markdown("- **Recommended Resources:** No resources available for this industry.")
+
+            else:
+                st.info("No opportunities match the selected filters.")
+        except ApiOverloaded as e:
+            # The call was shed and nothing cached could stand in for it
+            st.warning(f"Salesforce is busy, please try again in a moment. ({e})")
+        except Exception as e:
+            st.error(f"Error fetching opportunities: {e}")
+    else:
+        st.sidebar.error(f"Failed to connect to Salesforce: {connection.status()['last_error']}")
+        st.info("Unable to connect to Salesforce. Please check your credentials.")
+
+
+opportunities_viewer()
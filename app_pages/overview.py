@@ -0,0 +1,56 @@
+import streamlit as st
+
+
+# Overview Page
+def app_overview():
+    st.title("Welcome to the Salesforce Opportunities Viewer App :robot_face:")
+
+    # Explain the app's purpose
+    st.markdown("""
+    ## Purpose of the App
+    The Salesforce Opportunities Viewer App is a powerful tool designed for sales teams to streamline deal management and improve decision-making. 
+    It provides seamless access to Salesforce data, offering a detailed overview of opportunities, account details, and related activities.
+
+    This app is perfect for sales professionals who need:
+    - A centralized view of Salesforce Opportunities
+    - Quick insights into Opportunity details, probability, and close dates
+    - Guidance on next steps and risk analysis to improve win rates
+    - Access to recommended resources based on the industry
+
+    ## Key Features:
+    - **Opportunities Viewer**: Explore detailed information about Salesforce Opportunities, including stage, amount, and close date.
+    - **Risk Analysis**: Receive actionable insights based on probability, close date, and other metrics.
+    - **Deal Accelerator**: Get stage-specific guidance, next steps, and resource recommendations to maximize deal success.
+    - **Recent Activity**: Stay updated with recent tasks and events related to the Opportunity.
+    - **Account and Contact Details**: Access essential account attributes, primary contact details, and customer priority.
+
+    ## How to Use the App
+    1. **Overview**: This page provides an introduction to the app and its purpose.
+    2. **Opportunities Viewer**: Select an Opportunity to view detailed insights, guidance, and resources.
+    3. **Pipeline Risk**: Rank the whole open pipeline by risk, days to close and deal value.
+    4. **About the Author**: Learn more about the app developer and find links to connect and provide feedback.
+
+    ## Libraries Used:
+    - `Streamlit`: For building the interactive web application.
+    - `Pandas`: For handling and displaying Opportunity data.
+    - `Simple-Salesforce`: For connecting and querying Salesforce data.
+    - `Datetime`: For managing and analyzing dates in Salesforce Opportunities.
+
+    ## APIs Used:
+    - **Salesforce API**: For fetching Opportunities, Accounts, Contacts, and related activities.
+
+    ## Why Use This App?
+    - Improve decision-making with detailed Opportunity insights
+    - Streamline sales processes with actionable recommendations
+    - Enhance client interactions with industry-specific resources
+    - Boost productivity with a user-friendly, interactive interface
+
+    Let's get started! 🚀
+    Dive into the next section by picking a sub-page from the navigation menu on the left.
+    """, unsafe_allow_html=True)
+
+    # Embed the GIF; st.iframe replaces components.html, which Streamlit is removing
+    st.iframe("https://giphy.com/embed/L3Ki84G9k2lGJEKZL3", width=480, height=269)
+
+
+app_overview()
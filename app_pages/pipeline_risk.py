@@ -0,0 +1,116 @@
+import time
+
+import streamlit as st
+
+from api_scheduler import wait_for_budget
+from app_resources import format_age, get_salesforce_connection, get_snapshot_store
+from bulk_export import OPEN_PIPELINE_QUERY, BulkQueryExport
+from risk_scoring import RISK_CATEGORIES, rank_pipeline, score_pipeline
+
+
+PIPELINE_FIELDS = ["Id", "Name", "StageName", "CloseDate", "Amount", "Probability", "Region__c", "Segment__c"]
+
+
+def get_bulk_export(connection):
+    settings = st.secrets.get("bulk_export", {})
+    return BulkQueryExport(connection, settings.get("directory", "exports"),
+                           chunk_rows=settings.get("chunk_rows", 100000))
+
+
+# The latest finished export is loaded once and shared by all sessions
+@st.cache_resource(max_entries=1, show_spinner="Loading the pipeline export...")
+def load_pipeline_export(_export, job_id):
+    return _export.read(job_id, columns=PIPELINE_FIELDS)
+
+
+def run_bulk_export(export, job_id=None):
+    progress_bar = st.progress(0.0, text="Waiting for Salesforce to run the bulk query...")
+
+    def show_progress(rows, total_rows):
+        fraction = min(rows / total_rows, 1.0) if total_rows else 1.0
+        progress_bar.progress(fraction, text=f"Downloaded {rows:,} of {total_rows or rows:,} opportunities")
+
+    try:
+        # The rep is watching the progress bar, so wait for API budget rather than give up
+        with wait_for_budget():
+            if job_id:
+                export.resume(job_id, progress=show_progress)
+            else:
+                export.run(OPEN_PIPELINE_QUERY, progress=show_progress)
+    except Exception as e:
+        resumable = " It can be resumed from where it stopped." if export.pending() else ""
+        st.error(f"Bulk export failed: {e}.{resumable}")
+        return
+    st.rerun()
+
+
+# Pipeline Risk Page
+def pipeline_risk():
+    st.title("Pipeline Risk")
+    st.subheader("Open Opportunities Ranked by Risk")
+
+    store = get_snapshot_store()
+    if store and store.staleness() is not None:
+        # Same open pipeline as OPEN_PIPELINE_QUERY, whatever the org's closed stages are called
+        opportunities = store.read_frame("Opportunity")
+        opportunities = opportunities[opportunities["IsClosed"] == 0][PIPELINE_FIELDS]
+        st.caption(f"Read from the local snapshot, last synced {format_age(store.staleness())} ago")
+    else:
+        connection = get_salesforce_connection()
+        if not connection.is_connected():
+            st.info("Unable to connect to Salesforce. Please check your credentials.")
+            return
+        # Without a snapshot the whole pipeline comes from a Bulk API 2.0 export
+        export = get_bulk_export(connection)
+        pending = export.pending()
+        export_col, resume_col = st.columns(2)
+        if export_col.button("Export open pipeline (Bulk API 2.0)"):
+            run_bulk_export(export)
+        if pending and resume_col.button("Resume interrupted export"):
+            run_bulk_export(export, pending[0]["job_id"])
+
+        latest = export.latest()
+        if latest is None:
+            st.info("Export the open pipeline from Salesforce to rank it.")
+            return
+        opportunities = load_pipeline_export(export, latest["job_id"])
+        st.caption(f"Bulk export of {latest['rows']:,} opportunities, "
+                   f"finished {format_age(time.time() - latest['finished_at'])} ago")
+
+    if opportunities.empty:
+        st.info("No open opportunities found.")
+        return
+
+    scored = rank_pipeline(score_pipeline(opportunities))
+
+    # Summary per risk category
+    summary = scored.groupby("risk_category", observed=False).agg(deals=("Id", "size"), amount=("Amount", "sum"))
+    for column, (category, row) in zip(st.columns(len(RISK_CATEGORIES)), summary.iterrows()):
+        column.metric(category, f"{int(row['deals']):,}")
+        column.caption(f"${row['amount']:,.0f}")
+
+    categories = st.multiselect("Risk categories", RISK_CATEGORIES, default=RISK_CATEGORIES[:-1])
+    high_value_only = st.checkbox("High-value opportunities only")
+    selected = scored[scored["risk_category"].isin(categories)]
+    if high_value_only:
+        selected = selected[selected["high_value"]]
+
+    st.dataframe(
+        selected[["Name", "risk_category", "days_to_close", "StageName", "Probability", "Amount",
+                  "high_value", "Region__c", "Segment__c", "next_step"]],
+        hide_index=True,
+        column_config={
+            "risk_category": "Risk",
+            "days_to_close": st.column_config.NumberColumn("Days to Close"),
+            "StageName": "Stage",
+            "Probability": st.column_config.NumberColumn("Probability", format="%d%%"),
+            "Amount": st.column_config.NumberColumn("Amount", format="dollar"),
+            "high_value": "High Value",
+            "Region__c": "Region",
+            "Segment__c": "Segment",
+            "next_step": "Next Step",
+        },
+    )
+
+
+pipeline_risk()
@@ -0,0 +1,145 @@
+"""Resources shared by the app's pages, created once per server process.
+
+Heavy dependencies (pandas, simple_salesforce) are imported inside the functions that
+need them, so the entrypoint and the static pages load without them.
+"""
+import threading
+import time
+from pathlib import Path
+
+import streamlit as st
+
+from api_metrics import ApiMetrics, api_call_context
+from api_scheduler import ApiScheduler, wait_for_budget
+from record_cache import RecordCache
+from resource_catalog import ResourceCatalog
+
+
+# Seconds a sync started from the sidebar waits for API budget before giving up
+SYNC_BUDGET_WAIT = 30
+
+
+# API call metrics of the whole server process
+@st.cache_resource
+def get_api_metrics():
+    return ApiMetrics()
+
+
+# Budgets and retries of all Salesforce calls of the server process, tuned in a [scheduler] section
+@st.cache_resource
+def get_api_scheduler():
+    settings = st.secrets.get("scheduler", {})
+    return ApiScheduler(
+        max_concurrent=settings.get("max_concurrent", 8),
+        calls_per_minute=settings.get("calls_per_minute", 600),
+        burst=settings.get("burst", 200),
+        user_calls_per_minute=settings.get("user_calls_per_minute", 120),
+        user_burst=settings.get("user_burst", 60),
+        max_wait=settings.get("max_wait_seconds", 5),
+        max_retries=settings.get("max_retries", 3),
+    )
+
+
+# Shared Salesforce connection, created once per server process
+@st.cache_resource
+def get_salesforce_connection():
+    from salesforce_connection import SalesforceConnection
+
+    # Access credentials from the secrets file
+    credentials = st.secrets["salesforce"]
+    return SalesforceConnection(
+        username=credentials.get("username"),
+        password=credentials.get("password"),
+        security_token=credentials.get("security_token"),
+        domain=credentials.get("domain"),
+        instance_url=credentials.get("instance_url"),
+        session_id=credentials.get("session_id"),
+        verify=credentials.get("ca_bundle", True),
+        pool_size=credentials.get("pool_size", 10),
+        timeout=(credentials.get("connect_timeout", 5), credentials.get("read_timeout", 15)),
+        response_hooks=[get_api_metrics().response_hook],
+        deduplication_hooks=[get_api_metrics().deduplication_hook],
+        scheduler=get_api_scheduler()
+    )
+
+
+# Record cache shared by all browser sessions
+@st.cache_resource
+def get_record_cache():
+    settings = st.secrets.get("cache", {})
+    return RecordCache(
+        ttl=settings.get("ttl_seconds", 300),
+        max_bytes=settings.get("max_megabytes", 64) * 1024 * 1024,
+        max_age=settings.get("max_age_seconds", 3600)
+    )
+
+
+# Industry PDFs indexed once per server process
+@st.cache_resource
+def get_resource_catalog():
+    return ResourceCatalog(Path(__file__).parent / "resources")
+
+
+# Optional local snapshot of the pipeline, enabled by a [snapshot] section in the secrets file
+@st.cache_resource
+def get_snapshot_store():
+    settings = st.secrets.get("snapshot")
+    if not settings:
+        return None
+    from snapshot_store import SnapshotStore
+
+    return SnapshotStore(settings.get("path", "snapshot.sqlite"))
+
+
+# Keep the snapshot up to date from one background thread per server process
+@st.cache_resource
+def start_snapshot_sync(_store, _connection, interval_minutes):
+    def sync_forever():
+        while True:
+            try:
+                # Background work waits for budget instead of being shed
+                with api_call_context("Snapshot Sync", "background"), wait_for_budget():
+                    _store.sync(_connection)
+            except Exception:
+                pass  # Kept in store.last_sync_error and shown in the sidebar
+            time.sleep(interval_minutes * 60)
+
+    thread = threading.Thread(target=sync_forever, name="snapshot-sync", daemon=True)
+    thread.start()
+    return thread
+
+
+def format_age(seconds):
+    if seconds < 60:
+        return "less than a minute"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+# Sidebar data source switch; returns the snapshot store to read from, or None to read live
+def snapshot_sidebar(store, connection):
+    st.sidebar.subheader("Data Source")
+    # A running sync (e.g. the initial full load in the background) can take long, so don't queue behind it
+    if store.is_syncing():
+        st.sidebar.info("A snapshot sync is in progress.")
+    elif st.sidebar.button("Refresh snapshot now"):
+        with st.spinner("Syncing the local snapshot with Salesforce..."):
+            try:
+                with wait_for_budget(SYNC_BUDGET_WAIT):
+                    if store.sync(connection, blocking=False) is None:
+                        st.sidebar.info("A snapshot sync is in progress.")
+            except Exception:
+                pass  # Shown below from store.last_sync_error
+
+    if store.last_sync_error:
+        st.sidebar.warning(f"Last snapshot sync failed: {store.last_sync_error}")
+
+    staleness = store.staleness()
+    if staleness is None:
+        st.sidebar.info("The local snapshot hasn't been loaded yet, reading live from Salesforce.")
+        return None
+
+    use_snapshot = st.sidebar.toggle("Read from local snapshot", value=True)
+    st.sidebar.caption(f"Snapshot last synced {format_age(staleness)} ago")
+    return store if use_snapshot else None
@@ -0,0 +1,88 @@
+"""Check that the entrypoint and the static pages stay cheap to load.
+
+Each static page is rendered with ``AppTest`` in a fresh interpreter to find the modules
+``app.py`` and the page import on top of Streamlit. The check fails when that includes
+one of the heavy data dependencies, when importing those modules (timed with
+``python -X importtime``) or a rerun of the page goes over its budget.
+
+    python -m benchmarks.check_import_time
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+
+# Only the data pages may import these
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "simple_salesforce", "zeep"]
+
+# Budgets in milliseconds per static page
+BUDGETS = {
+    "app_pages/overview.py": {"import_ms": 50, "rerun_ms": 50},
+    "app_pages/about_the_author.py": {"import_ms": 50, "rerun_ms": 50},
+}
+
+PROBE_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+app_test = AppTest.from_file(sys.argv[1], default_timeout=60)
+app_test.switch_page(sys.argv[2])
+app_test.run()
+started = time.perf_counter()
+app_test.run()
+rerun = time.perf_counter() - started
+assert not app_test.exception, app_test.exception
+print(json.dumps({
+    "rerun_ms": 1000 * rerun,
+    "modules": sorted({name.split(".")[0] for name in set(sys.modules) - before} - {"streamlit"}),
+}))
+"""
+
+
+def probe(page):
+    output = subprocess.run([sys.executable, "-c", PROBE_SCRIPT, str(APP), page],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def import_time_ms(modules):
+    """Time importing ``modules`` in a fresh interpreter that has already imported Streamlit."""
+    if not modules:
+        return 0.0
+    code = f"import streamlit; import {', '.join(modules)}"
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    total = 0
+    # "import time: self [us] | cumulative | imported package"; nested imports are indented
+    for line in stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and not fields[2].startswith("  ") and fields[2].strip() in modules:
+            total += int(fields[1])
+    return total / 1000
+
+
+def main():
+    failures = []
+    for page, budgets in BUDGETS.items():
+        result = probe(page)
+        result["import_ms"] = import_time_ms(result["modules"])
+        print(f"{page}: imports {', '.join(result['modules'])} in {result['import_ms']:.0f} ms, "
+              f"rerun {result['rerun_ms']:.0f} ms")
+
+        heavy = sorted(set(HEAVY_MODULES) & set(result["modules"]))
+        if heavy:
+            failures.append(f"{page} imports {', '.join(heavy)}")
+        for name, budget in budgets.items():
+            if result[name] > budget:
+                failures.append(f"{page} {name} is {result[name]:.0f}, over the budget of {budget}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
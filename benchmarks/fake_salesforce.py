@@ -0,0 +1,708 @@
+"""Local stand-in for the Salesforce REST API, serving a synthetic org over HTTPS.
+
+Supports the subset of the API the app uses: SOQL queries with parent fields, child
+relationship subqueries, semi-joins and query cursors, sObject describe and get, and
+Bulk API 2.0 query jobs. Records are generated from their index on demand, so orgs of
+a million Opportunities don't have to be held in memory.
+
+    python -m benchmarks.fake_salesforce --opportunities 100000 --latency-ms 50 \\
+        --certfile cert.pem --keyfile key.pem
+"""
+import argparse
+import csv
+import datetime
+import io
+import itertools
+import json
+import re
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from resource_catalog import INDUSTRY_RESOURCES
+
+STAGE_PROBABILITIES = {
+    "Prospecting": 10,
+    "Qualification": 10,
+    "Needs Analysis": 20,
+    "Value Proposition": 50,
+    "Id. Decision Makers": 60,
+    "Perception Analysis": 70,
+    "Proposal/Price Quote": 75,
+    "Negotiation/Review": 90,
+    "Closed Won": 100,
+    "Closed Lost": 0,
+}
+STAGES = list(STAGE_PROBABILITIES)
+REGIONS = ["North America", "EMEA", "APAC", "LATAM"]
+SEGMENTS = ["Enterprise", "Mid-Market", "SMB"]
+INDUSTRIES = list(INDUSTRY_RESOURCES)
+ACCOUNT_TYPES = ["Customer - Direct", "Customer - Channel", "Prospect", "Partner"]
+RATINGS = ["Hot", "Warm", "Cold"]
+PRIORITIES = ["High", "Medium", "Low"]
+TASK_STATUSES = ["Not Started", "In Progress", "Completed"]
+OWNERS = 25
+
+# Key prefix of each sObject's Ids; Ids are the prefix, the zero-padded index and "AAA"
+KEY_PREFIXES = {"Account": "001", "Contact": "003", "Opportunity": "006", "Task": "00T", "Event": "00U", "User": "005"}
+OBJECT_BY_PREFIX = {prefix: sobject for sobject, prefix in KEY_PREFIXES.items()}
+
+# Parent relationship name -> (lookup field, parent sObject)
+# Polymorphic lookups have no fixed parent sObject; only their Type can be selected here
+PARENT_RELATIONSHIPS = {"Account": ("AccountId", "Account"), "Owner": ("OwnerId", "User"), "What": ("WhatId", None)}
+
+# (parent sObject, child relationship name) -> (child sObject, lookup field on the child)
+CHILD_RELATIONSHIPS = {
+    ("Account", "Contacts"): ("Contact", "AccountId"),
+    ("Account", "Opportunities"): ("Opportunity", "AccountId"),
+    ("Opportunity", "Tasks"): ("Task", "WhatId"),
+    ("Opportunity", "Events"): ("Event", "WhatId"),
+}
+
+PICKLIST_FIELDS = {"StageName": STAGES, "Region__c": REGIONS, "Segment__c": SEGMENTS}
+
+# Record names are the sObject and the zero-padded index, so they sort in Id order
+NAME_FORMATS = {"Opportunity": "Opportunity {:07d}", "Account": "Account {:06d}", "Contact": "Contact {:07d}"}
+
+SYSTEM_MODSTAMP = "2026-01-01T00:00:00.000+0000"
+API_LIMIT = 5000000
+
+
+def record_id(sobject, index):
+    return f"{KEY_PREFIXES[sobject]}{index:012d}AAA"
+
+
+def parse_id(value):
+    """Return the (sObject, index) an Id was generated from, or (None, None)."""
+    if not isinstance(value, str) or len(value) != 18 or not value[3:15].isdigit():
+        return None, None
+    return OBJECT_BY_PREFIX.get(value[:3]), int(value[3:15])
+
+
+def _pick(index, salt, choices):
+    # Deterministic pseudo-random choice, so a record looks the same on every request
+    return choices[((index + 1) * 2654435761 + salt * 40503) % 4294967291 % len(choices)]
+
+
+class SyntheticOrg:
+    """Deterministic org of ``opportunities`` Opportunities with their Accounts, Contacts and activities.
+
+    Opportunity names sort in Id order, so the picker's ``ORDER BY Name, Id`` can be
+    streamed without sorting the whole org.
+    """
+
+    def __init__(self, opportunities=10000, opportunities_per_account=5, contacts_per_account=3,
+                 activities_per_opportunity=2, today=None):
+        self.today = today or datetime.date.today()
+        self.per_account = opportunities_per_account
+        self.contacts_per_account = contacts_per_account
+        self.activities_per_opportunity = activities_per_opportunity
+        accounts = -(-opportunities // opportunities_per_account)
+        self.counts = {
+            "Opportunity": opportunities,
+            "Account": accounts,
+            "Contact": accounts * contacts_per_account,
+            "Task": opportunities * activities_per_opportunity,
+            "Event": opportunities * activities_per_opportunity,
+            "User": OWNERS,
+        }
+        self.natural_order = {"Opportunity": ["Name", "Id"], "Account": ["Name", "Id"]}
+
+    def _date(self, index, salt, low, high):
+        return (self.today + datetime.timedelta(days=_pick(index, salt, range(low, high)))).isoformat()
+
+    def record(self, sobject, index):
+        common = {"Id": record_id(sobject, index), "SystemModstamp": SYSTEM_MODSTAMP, "IsDeleted": False}
+        if sobject == "Opportunity":
+            stage = _pick(index, 1, STAGES)
+            return {
+                **common,
+                "Name": NAME_FORMATS[sobject].format(index),
+                "AccountId": record_id("Account", index // self.per_account),
+                "OwnerId": record_id("User", index % OWNERS),
+                "StageName": stage,
+                "Region__c": _pick(index, 2, REGIONS),
+                "Segment__c": _pick(index, 3, SEGMENTS),
+                "CloseDate": self._date(index, 4, -60, 180),
+                "Amount": float(_pick(index, 5, range(5, 250)) * 1000),
+                "Probability": float(STAGE_PROBABILITIES[stage]),
+                "IsClosed": stage.startswith("Closed"),
+            }
+        if sobject == "Account":
+            return {
+                **common,
+                "Name": NAME_FORMATS[sobject].format(index),
+                "AccountNumber": f"CD{index:06d}",
+                "Industry": _pick(index, 6, INDUSTRIES),
+                "CustomerPriority__c": _pick(index, 7, PRIORITIES),
+                "Type": _pick(index, 8, ACCOUNT_TYPES),
+                "Rating": _pick(index, 9, RATINGS),
+            }
+        if sobject == "Contact":
+            return {
+                **common,
+                "AccountId": record_id("Account", index // self.contacts_per_account),
+                "Name": NAME_FORMATS[sobject].format(index),
+                "Email": f"contact{index}@example.com",
+                "Phone": f"+1 555 {index % 10000000:07d}",
+                "Title": _pick(index, 10, ["CEO", "CFO", "VP Sales", "Procurement Manager", "IT Director"]),
+            }
+        if sobject in ("Task", "Event"):
+            activity = {
+                **common,
+                "WhatId": record_id("Opportunity", index // self.activities_per_opportunity),
+                "Subject": f"{_pick(index, 11, ['Call', 'Email', 'Meeting', 'Demo'])} {index}",
+                "ActivityDate": self._date(index, 12, -90, 30),
+                "Description": "Synthetic activity",
+                "CreatedDate": SYSTEM_MODSTAMP,
+            }
+            if sobject == "Task":
+                activity["Status"] = _pick(index, 13, TASK_STATUSES)
+            return activity
+        if sobject == "User":
+            return {**common, "Name": f"Sales Rep {index:02d}"}
+        raise KeyError(sobject)
+
+    def get(self, value):
+        sobject, index = parse_id(value)
+        if sobject is None or index >= self.counts[sobject]:
+            return None, None
+        return sobject, self.record(sobject, index)
+
+    def scan(self, sobject, name_pattern=None):
+        # A name pattern is matched before the rest of the record is generated, which keeps searches fast
+        indexes = range(self.counts[sobject])
+        if name_pattern is not None and sobject in NAME_FORMATS:
+            indexes = (i for i in indexes if name_pattern.match(NAME_FORMATS[sobject].format(i)))
+        return (self.record(sobject, index) for index in indexes)
+
+    def related(self, sobject, field, parent_id):
+        """Records of ``sobject`` whose ``field`` lookup points at ``parent_id``."""
+        _, parent = parse_id(parent_id)
+        if parent is None:
+            return []
+        size = {"AccountId": self.per_account if sobject == "Opportunity" else self.contacts_per_account,
+                "WhatId": self.activities_per_opportunity}[field]
+        indexes = range(parent * size, min((parent + 1) * size, self.counts[sobject]))
+        return [self.record(sobject, index) for index in indexes]
+
+
+class SoqlError(ValueError):
+    pass
+
+
+_CLAUSE = re.compile(r"\b(SELECT|FROM|WHERE|GROUP BY|ORDER BY|LIMIT|OFFSET)\b", re.IGNORECASE)
+_AGGREGATE = re.compile(r"^(COUNT|SUM|MIN|MAX|AVG)\((\w*)\)(?:\s+(\w+))?$", re.IGNORECASE)
+_CONDITION = re.compile(r"^([\w.]+)\s*(=|!=|<=|>=|<|>|LIKE\b|NOT IN\b|IN\b)\s*(.+)$", re.IGNORECASE | re.DOTALL)
+
+
+def _mask(text):
+    # Blank out quoted strings and parenthesised text, so clause keywords are only found at the top level
+    masked, depth, quote, escaped = [], 0, False, False
+    for char in text:
+        top_level = depth == 0 and not quote
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == "'":
+                quote = False
+        elif char == "'":
+            quote = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        masked.append(char if top_level and char not in "'()" else " ")
+    return "".join(masked)
+
+
+def _split(text, pattern):
+    masked = _mask(text)
+    parts, start = [], 0
+    for match in re.finditer(pattern, masked, re.IGNORECASE):
+        parts.append(text[start:match.start()].strip())
+        start = match.end()
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def parse_query(soql):
+    """Split a SOQL query into its clauses."""
+    soql = soql.strip()
+    matches = list(_CLAUSE.finditer(_mask(soql)))
+    clauses = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        clauses[" ".join(match.group(1).upper().split())] = soql[match.end():following.start() if following else None].strip()
+    if "SELECT" not in clauses or "FROM" not in clauses:
+        raise SoqlError(f"Unsupported query: {soql}")
+    return {
+        "fields": _split(clauses["SELECT"], r","),
+        "sobject": clauses["FROM"],
+        "where": [_parse_condition(condition) for condition in _split(clauses.get("WHERE", ""), r"\bAND\b")],
+        "group_by": _split(clauses.get("GROUP BY", ""), r","),
+        "order_by": [_parse_order(item) for item in _split(clauses.get("ORDER BY", ""), r",")],
+        "limit": int(clauses["LIMIT"]) if "LIMIT" in clauses else None,
+        "offset": int(clauses.get("OFFSET", 0)),
+    }
+
+
+def _parse_literal(text):
+    text = text.strip()
+    if text.startswith("'") and text.endswith("'"):
+        return re.sub(r"\\(.)", r"\1", text[1:-1])
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered == "null":
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return text  # Date and datetime literals compare as ISO strings
+
+
+def _parse_condition(text):
+    match = _CONDITION.match(text)
+    if not match:
+        raise SoqlError(f"Unsupported condition: {text}")
+    field, operator, value = match.group(1), " ".join(match.group(2).upper().split()), match.group(3).strip()
+    if operator in ("IN", "NOT IN"):
+        inner = value[1:-1].strip()
+        value = parse_query(inner) if inner.upper().startswith("SELECT") else \
+            [_parse_literal(item) for item in _split(inner, r",")]
+    elif operator == "LIKE":
+        wildcards = {"%": ".*", "_": "."}
+        pattern = re.sub(r"\\(.)|[%_]|[^%_\\]+",
+                         lambda m: re.escape(m.group(1)) if m.group(1) else wildcards.get(m.group(0), re.escape(m.group(0))),
+                         value.strip()[1:-1])
+        value = re.compile(f"^{pattern}$", re.IGNORECASE | re.DOTALL)
+    else:
+        value = _parse_literal(value)
+    return field, operator, value
+
+
+def _parse_order(text):
+    words = text.split()
+    descending = len(words) > 1 and words[1].upper() == "DESC"
+    nulls_last = "LAST" in (word.upper() for word in words[2:]) or (descending and "FIRST" not in text.upper())
+    return words[0], descending, nulls_last
+
+
+class QueryEngine:
+    """Evaluates parsed SOQL queries against a ``SyntheticOrg``."""
+
+    def __init__(self, org):
+        self.org = org
+
+    def value(self, sobject, record, path):
+        while "." in path:
+            relationship, path = path.split(".", 1)
+            lookup_field, parent_sobject = PARENT_RELATIONSHIPS[relationship]
+            sobject, record = self.org.get(record.get(lookup_field))
+            if record is None:
+                return None
+            if parent_sobject is None:
+                return sobject if path == "Type" else None
+        return record.get(path)
+
+    def _matches(self, sobject, record, conditions):
+        for field, operator, expected in conditions:
+            actual = self.value(sobject, record, field)
+            if operator == "LIKE":
+                matched = actual is not None and expected.match(str(actual)) is not None
+            elif operator in ("IN", "NOT IN"):
+                values = self._values(expected) if isinstance(expected, dict) else expected
+                matched = (actual in values) == (operator == "IN")
+            elif operator == "=":
+                matched = actual == expected
+            elif operator == "!=":
+                matched = actual != expected
+            elif actual is None or expected is None:
+                matched = False
+            else:
+                matched = {"<": actual < expected, ">": actual > expected,
+                           "<=": actual <= expected, ">=": actual >= expected}[operator]
+            if not matched:
+                return False
+        return True
+
+    def _values(self, query):
+        # Values of the single field selected by a semi-join subquery
+        return {self.value(query["sobject"], record, query["fields"][0]) for record in self._filtered(query)}
+
+    def _candidates(self, query):
+        # Use the Id structure instead of a full scan where a condition allows it
+        sobject = query["sobject"]
+        for field, operator, value in query["where"]:
+            if field == "Id" and operator == "=":
+                found, record = self.org.get(value)
+                return [record] if found == sobject else []
+            if field == "Id" and operator == "IN":
+                values = self._values(value) if isinstance(value, dict) else value
+                return [record for found, record in map(self.org.get, sorted(v for v in values if v))
+                        if found == sobject]
+            if field in ("AccountId", "WhatId") and operator == "=":
+                return self.org.related(sobject, field, value)
+        name_patterns = [value for field, operator, value in query["where"] if field == "Name" and operator == "LIKE"]
+        return self.org.scan(sobject, name_patterns[0] if name_patterns else None)
+
+    def _filtered(self, query):
+        sobject = query["sobject"]
+        return (record for record in self._candidates(query) if self._matches(sobject, record, query["where"]))
+
+    def _sorted(self, query, records):
+        sobject, order_by = query["sobject"], query["order_by"]
+        natural = self.org.natural_order.get(sobject, [])
+        if not order_by or (not any(descending for _, descending, _ in order_by)
+                            and [field for field, _, _ in order_by] == natural[:len(order_by)]):
+            return records
+        records = list(records)
+        for field, descending, nulls_last in reversed(order_by):
+            present = [r for r in records if self.value(sobject, r, field) is not None]
+            missing = [r for r in records if self.value(sobject, r, field) is None]
+            present.sort(key=lambda r: self.value(sobject, r, field), reverse=descending)
+            records = present + missing if nulls_last else missing + present
+        return records
+
+    def rows(self, query):
+        """Matching records, in order, as an iterator of flat records."""
+        records = self._sorted(query, self._filtered(query))
+        stop = None if query["limit"] is None else query["offset"] + query["limit"]
+        return itertools.islice(records, query["offset"], stop)
+
+    def aggregate(self, query):
+        """Evaluate a GROUP BY query into AggregateResult records."""
+        groups = {}
+        for record in self.rows({**query, "limit": None, "offset": 0}):
+            key = tuple(self.value(query["sobject"], record, field) for field in query["group_by"])
+            groups.setdefault(key, []).append(record)
+
+        results = []
+        for key, records in groups.items():
+            result = {"attributes": {"type": "AggregateResult"}}
+            result.update(zip(query["group_by"], key))
+            for position, item in enumerate(query["fields"]):
+                match = _AGGREGATE.match(item)
+                if not match:
+                    continue
+                function, field, alias = match.group(1).upper(), match.group(2), match.group(3)
+                values = [v for v in (self.value(query["sobject"], r, field or "Id") for r in records) if v is not None]
+                result[alias or f"expr{position}"] = (
+                    len(values) if function == "COUNT"
+                    else None if not values
+                    else {"SUM": sum, "MIN": min, "MAX": max, "AVG": lambda v: sum(v) / len(v)}[function](values)
+                )
+            results.append(result)
+        return results
+
+    def count(self, query):
+        if not query["where"] and query["limit"] is None:
+            return max(self.org.counts[query["sobject"]] - query["offset"], 0)
+        return sum(1 for _ in self.rows(query))
+
+    def render(self, query, record, version):
+        """Shape a flat record like a REST API query result record."""
+        sobject = query["sobject"]
+        result = {"attributes": self._attributes(sobject, record["Id"], version)}
+        for field in query["fields"]:
+            if field.startswith("("):
+                result.update(self._render_children(sobject, record, field[1:-1], version))
+            elif "." in field:
+                relationship, name = field.split(".", 1)
+                lookup_field, parent_object = PARENT_RELATIONSHIPS[relationship]
+                _, parent = self.org.get(record.get(lookup_field))
+                # A polymorphic lookup (What) is typed as Name, like Salesforce does
+                target = result.setdefault(relationship, None if parent is None else
+                                           {"attributes": self._attributes(parent_object or "Name", parent["Id"],
+                                                                           version)})
+                if target is not None:
+                    target[name] = self.value(sobject, record, field)
+            else:
+                result[field] = record.get(field)
+        return result
+
+    def _render_children(self, sobject, record, soql, version):
+        subquery = parse_query(soql)
+        relationship = subquery["sobject"]
+        child_object, lookup_field = CHILD_RELATIONSHIPS[(sobject, relationship)]
+        subquery = {**subquery, "sobject": child_object,
+                    "where": [(lookup_field, "=", record["Id"])] + subquery["where"]}
+        children = [self.render(subquery, child, version) for child in self.rows(subquery)]
+        # Salesforce returns null rather than an empty result for a relationship without records
+        return {relationship: {"totalSize": len(children), "done": True, "records": children} if children else None}
+
+    @staticmethod
+    def _attributes(sobject, value, version):
+        return {"type": sobject, "url": f"/services/data/v{version}/sobjects/{sobject}/{value}"}
+
+
+class FakeSalesforce(ThreadingHTTPServer):
+    """HTTPS server answering Salesforce REST and Bulk API 2.0 requests from a ``SyntheticOrg``.
+
+    Every request waits ``latency`` seconds first, to stand in for the network round trip
+    and the org's processing time. ``GET /__stats`` returns the request counts so far.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, org, latency=0.0, certfile=None, keyfile=None):
+        super().__init__(address, FakeSalesforceHandler)
+        self.org = org
+        self.engine = QueryEngine(org)
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.cursors = {}
+        self.jobs = {}
+        self.requests = {}
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+
+    @property
+    def url(self):
+        scheme = "https" if isinstance(self.socket, ssl.SSLSocket) else "http"
+        return f"{scheme}://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count_request(self, operation):
+        with self._lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+            return sum(self.requests.values())
+
+    def new_id(self, prefix):
+        with self._lock:
+            return f"{prefix}FAKE{next(self._ids):011d}"
+
+
+class FakeSalesforceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    ROUTES = [
+        ("GET", re.compile(r"^/services/data/v([\d.]+)/(?:query|queryAll)/?$"), "_query"),
+        ("GET", re.compile(r"^/services/data/v([\d.]+)/(?:query|queryAll)/([\w]+)-(\d+)$"), "_query_more"),
+        ("GET", re.compile(r"^/services/data/v([\d.]+)/sobjects/(\w+)/describe/?$"), "_describe"),
+        ("GET", re.compile(r"^/services/data/v([\d.]+)/sobjects/(\w+)/(\w+)$"), "_get_record"),
+        ("POST", re.compile(r"^/services/data/v([\d.]+)/jobs/query/?$"), "_create_job"),
+        ("GET", re.compile(r"^/services/data/v([\d.]+)/jobs/query/(\w+)$"), "_job_status"),
+        ("GET", re.compile(r"^/services/data/v([\d.]+)/jobs/query/(\w+)/results$"), "_job_results"),
+    ]
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        self.params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+
+        if url.path == "/__stats":
+            with self.server._lock:
+                requests = dict(self.server.requests)
+            return self._send_json(200, {"requests": sum(requests.values()), "by_operation": requests})
+
+        for route_method, pattern, handler_name in self.ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                used = self.server.count_request(f"{method} {handler_name.strip('_')}")
+                time.sleep(self.server.latency)
+                try:
+                    return getattr(self, handler_name)(*match.groups(), used=used)
+                except SoqlError as e:
+                    return self._send_json(400, [{"errorCode": "MALFORMED_QUERY", "message": str(e)}], used)
+        self._send_json(404, [{"errorCode": "NOT_FOUND", "message": f"{method} {url.path} is not supported"}])
+
+    def _send(self, status, body, content_type, used=None, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if used is not None:
+            self.send_header("Sforce-Limit-Info", f"api-usage={used}/{API_LIMIT}")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, used=None):
+        self._send(status, json.dumps(payload).encode(), "application/json;charset=UTF-8", used)
+
+    def _batch_size(self):
+        match = re.search(r"batchSize=(\d+)", self.headers.get("Sforce-Query-Options", ""))
+        return max(200, min(int(match.group(1)), 2000)) if match else 2000
+
+    def _query(self, version, used):
+        query = parse_query(self.params.get("q", ""))
+        engine = self.server.engine
+        if query["group_by"]:
+            records = engine.aggregate(query)
+            return self._send_json(200, {"totalSize": len(records), "done": True, "records": records}, used)
+        if query["where"]:
+            # Filtered results are counted by materialising them, which also serves the later pages
+            rows = list(engine.rows(query))
+            total, rows = len(rows), iter(rows)
+        else:
+            total, rows = engine.count(query), engine.rows(query)
+        self._send_page(version, query, rows, total, 0, used)
+
+    def _query_more(self, version, cursor_id, position, used):
+        with self.server._lock:
+            cursor = self.server.cursors.pop(cursor_id, None)
+        if cursor is None or cursor["position"] != int(position):
+            return self._send_json(400, [{"errorCode": "INVALID_QUERY_LOCATOR", "message": "invalid query locator"}],
+                                   used)
+        self._send_page(version, cursor["query"], cursor["rows"], cursor["total"], cursor["position"], used)
+
+    def _send_page(self, version, query, rows, total, position, used):
+        batch = list(itertools.islice(rows, self._batch_size()))
+        done = position + len(batch) >= total
+        payload = {"totalSize": total, "done": done,
+                   "records": [self.server.engine.render(query, record, version) for record in batch]}
+        if not done:
+            cursor_id = self.server.new_id("0r8")
+            position += len(batch)
+            with self.server._lock:
+                self.server.cursors[cursor_id] = {"query": query, "rows": rows, "total": total, "position": position}
+            payload["nextRecordsUrl"] = f"/services/data/v{version}/query/{cursor_id}-{position}"
+        self._send_json(200, payload, used)
+
+    def _describe(self, version, sobject, used):
+        if sobject not in KEY_PREFIXES:
+            return self._send_json(404, [{"errorCode": "NOT_FOUND", "message": f"Unknown sObject {sobject}"}], used)
+        fields = [{"name": name, "type": "picklist",
+                   "picklistValues": [{"value": value, "label": value, "active": True} for value in values]}
+                  for name, values in PICKLIST_FIELDS.items()] if sobject == "Opportunity" else []
+        fields.insert(0, {"name": "Id", "type": "id", "picklistValues": []})
+        self._send_json(200, {"name": sobject, "keyPrefix": KEY_PREFIXES[sobject], "fields": fields}, used)
+
+    def _get_record(self, version, sobject, value, used):
+        found, record = self.server.org.get(value)
+        if found != sobject:
+            return self._send_json(404, [{"errorCode": "NOT_FOUND", "message": "The requested resource does not exist"}],
+                                   used)
+        self._send_json(200, {"attributes": QueryEngine._attributes(sobject, value, version), **record}, used)
+
+    def _create_job(self, version, used):
+        request = json.loads(self.body or b"{}")
+        query = parse_query(request.get("query", ""))
+        job_id = self.server.new_id("750")
+        with self.server._lock:
+            self.server.jobs[job_id] = {"query": query, "total": None, "rows": None, "position": 0}
+        self._send_json(200, {"id": job_id, "operation": "query", "object": query["sobject"],
+                              "state": "UploadComplete"}, used)
+
+    def _job(self, job_id):
+        with self.server._lock:
+            return self.server.jobs.get(job_id)
+
+    def _job_status(self, version, job_id, used):
+        job = self._job(job_id)
+        if job is None:
+            return self._send_json(404, [{"errorCode": "NOT_FOUND", "message": f"Unknown job {job_id}"}], used)
+        if job["total"] is None:
+            job["total"] = self.server.engine.count(job["query"])
+        self._send_json(200, {"id": job_id, "state": "JobComplete", "numberRecordsProcessed": job["total"]}, used)
+
+    def _job_results(self, version, job_id, used):
+        job = self._job(job_id)
+        if job is None:
+            return self._send_json(404, [{"errorCode": "NOT_FOUND", "message": f"Unknown job {job_id}"}], used)
+        query, engine = job["query"], self.server.engine
+        locator = int(self.params.get("locator") or 0)
+        max_records = int(self.params.get("maxRecords") or 50000)
+
+        # Chunks are normally read in order, so keep streaming from where the last one stopped
+        if job["rows"] is None or job["position"] != locator:
+            job["rows"] = itertools.islice(engine.rows(query), locator, None)
+        batch = list(itertools.islice(job["rows"], max_records))
+        job["position"] = locator + len(batch)
+
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(query["fields"])
+        for record in batch:
+            writer.writerow(_csv_value(engine.value(query["sobject"], record, field)) for field in query["fields"])
+        more = job["total"] is None or job["position"] < job["total"]
+        headers = [("Sforce-Locator", str(job["position"]) if batch and more else "null"),
+                   ("Sforce-NumberOfRecords", str(len(batch)))]
+        self._send(200, output.getvalue().encode(), "text/csv", used, headers)
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else value
+
+
+def generate_certificate(certfile, keyfile, host="127.0.0.1"):
+    """Write a self-signed certificate for ``host``; pass ``certfile`` as the client's CA bundle."""
+    import ipaddress
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, host)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=7))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address(host)),
+                                                    x509.DNSName("localhost")]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    with open(certfile, "wb") as file:
+        file.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(keyfile, "wb") as file:
+        file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                     serialization.NoEncryption()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--opportunities", type=int, default=10000, help="org size, e.g. 1000 to 1000000")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every API request")
+    parser.add_argument("--certfile", help="serve HTTPS with this certificate (generated if missing)")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    if args.certfile and not args.keyfile:
+        parser.error("--keyfile is required with --certfile")
+    if args.certfile:
+        try:
+            open(args.certfile).close()
+        except FileNotFoundError:
+            generate_certificate(args.certfile, args.keyfile, args.host)
+
+    server = FakeSalesforce((args.host, args.port), SyntheticOrg(args.opportunities),
+                            latency=args.latency_ms / 1000, certfile=args.certfile, keyfile=args.keyfile)
+    print(f"Serving {args.opportunities:,} opportunities on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Benchmark the app headlessly against the local fake Salesforce server.
+
+Starts ``benchmarks.fake_salesforce`` with a synthetic org, drives ``app.py`` through
+Streamlit's ``AppTest`` over the Overview and Opportunities Viewer pages and reports
+cold-start time, rerun latency and Salesforce API calls per interaction and peak
+memory. Results are compared with ``baseline.json``; any regression fails the run.
+
+    python -m benchmarks.run_benchmarks --opportunities 10000 --latency-ms 20
+    python -m benchmarks.run_benchmarks --opportunities 10000 --latency-ms 20 --update-baseline
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.fake_salesforce import record_id
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+VIEWER_PAGE = "app_pages/opportunities_viewer.py"
+BACKGROUND_PAGES = {"Prefetch", "Snapshot Sync"}
+SELECTIONS = 5
+
+# Allowed slack over the baseline per kind of metric: (relative, absolute)
+TOLERANCES = {"seconds": (0.25, 0.05), "api_calls": (0.0, 0.0), "megabytes": (0.15, 2.0)}
+
+# Runs in a fresh interpreter, so imports and the first render are both part of the cold start
+COLD_START_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app_test = AppTest.from_file(sys.argv[1], default_timeout=120)
+for section, values in json.loads(sys.argv[2]).items():
+    app_test.secrets[section] = values
+app_test.run()
+assert not app_test.exception, app_test.exception
+print(time.perf_counter() - started)
+"""
+
+
+class FakeServer:
+    """``benchmarks.fake_salesforce`` in a child process, so it doesn't share the GIL or heap with the app."""
+
+    def __init__(self, directory, opportunities, latency_ms):
+        self.certfile = str(Path(directory) / "cert.pem")
+        keyfile = str(Path(directory) / "key.pem")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_salesforce", "--opportunities", str(opportunities),
+             "--latency-ms", str(latency_ms), "--certfile", self.certfile, "--keyfile", keyfile],
+            cwd=ROOT, stdout=subprocess.PIPE, text=True,
+        )
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("The fake Salesforce server didn't start")
+        self.url = line.split()[-1]
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def app_secrets(server, directory, prefetch_calls_per_minute=0):
+    return {
+        "salesforce": {"instance_url": server.url, "session_id": "benchmark", "ca_bundle": server.certfile},
+        "bulk_export": {"directory": str(Path(directory) / "exports")},
+        # Background prefetching makes the call counts timing dependent, so it's opt-in here
+        "prefetch": {"calls_per_minute": prefetch_calls_per_minute},
+    }
+
+
+def clear_caches():
+    # AppTest runs the script in this process, so cached resources would leak between passes
+    import streamlit as st
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def measure_cold_start(secrets):
+    output = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT, str(APP), json.dumps(secrets)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return float(output.split()[-1])
+
+
+def interactions():
+    """The scripted session, as (name, action) pairs; ``action(app_test)`` returns the element to run."""
+    def picker(app_test):
+        return next(s for s in app_test.selectbox if s.label == "Select an Opportunity")
+
+    def button(app_test, label):
+        return next(b for b in app_test.button if b.label == label)
+
+    def open_expander(app_test, key):
+        app_test.session_state[key] = True
+        return app_test
+
+    steps = [
+        ("overview", lambda at: at),
+        ("overview_rerun", lambda at: at),
+        ("viewer_open", lambda at: at.switch_page(VIEWER_PAGE)),
+    ]
+    # The picker lists Opportunities by name, which in the synthetic org is the order they were generated in
+    steps += [("viewer_select", lambda at, i=i: picker(at).set_value(record_id("Opportunity", i)))
+              for i in range(1, SELECTIONS + 1)]
+    steps += [
+        ("viewer_reselect", lambda at: picker(at).set_value(record_id("Opportunity", 1))),
+        ("viewer_other_opportunities", lambda at: open_expander(at, "other_opportunities")),
+        ("viewer_next_page", lambda at: button(at, "Next ▶").click()),
+        ("viewer_search", lambda at: at.text_input[0].input("Opportunity 00001")),
+    ]
+    return steps
+
+
+def foreground_calls():
+    """Salesforce calls made by the pages so far, as recorded by the app's own ``ApiMetrics``.
+
+    AppTest runs the script in this process, so this is the same cached instance the app
+    uses. Calls of background work (prefetching, snapshot sync) aren't part of an interaction.
+    """
+    from app_resources import get_api_metrics
+
+    return sum(row["calls"] for row in get_api_metrics().summary() if row["page"] not in BACKGROUND_PAGES)
+
+
+def run_session(secrets, think_seconds=0):
+    """Run the scripted session once; returns {name: [(seconds, api_calls), ...]}.
+
+    ``think_seconds`` is an untimed pause after each interaction, like a rep reading the page.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    clear_caches()
+    app_test = AppTest.from_file(str(APP), default_timeout=120)
+    for section, values in secrets.items():
+        app_test.secrets[section] = values
+
+    results = {}
+    for name, action in interactions():
+        element = action(app_test)
+        calls_before = foreground_calls()
+        started = time.perf_counter()
+        element.run()
+        elapsed = time.perf_counter() - started
+        if app_test.exception:
+            raise RuntimeError(f"{name} raised {app_test.exception[0].message}")
+        if app_test.error:
+            raise RuntimeError(f"{name} showed an error: {app_test.error[0].value}")
+        results.setdefault(name, []).append((elapsed, foreground_calls() - calls_before))
+        time.sleep(think_seconds)
+    return results
+
+
+def run_benchmarks(secrets, think_seconds=0):
+    metrics = {"cold_start.seconds": measure_cold_start(secrets)}
+    for name, samples in run_session(secrets, think_seconds).items():
+        metrics[f"{name}.seconds"] = statistics.mean(seconds for seconds, _ in samples)
+        metrics[f"{name}.api_calls"] = statistics.mean(calls for _, calls in samples)
+
+    # Tracing slows Python down considerably, so memory is measured in a separate pass
+    tracemalloc.start()
+    run_session(secrets, think_seconds)
+    metrics["peak_memory.megabytes"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return {name: round(value, 4) for name, value in metrics.items()}
+
+
+def compare(metrics, baseline):
+    """Print current metrics against the baseline and return the names of the regressed ones."""
+    regressions = []
+    print(f"{'metric':<32} {'baseline':>10} {'current':>10}")
+    for name, value in metrics.items():
+        expected = baseline.get(name)
+        relative, absolute = TOLERANCES[name.rsplit(".", 1)[-1]]
+        regressed = expected is not None and value > expected * (1 + relative) + absolute
+        if regressed:
+            regressions.append(name)
+        shown = "-" if expected is None else f"{expected:,.4g}"
+        print(f"{name:<32} {shown:>10} {value:>10,.4g}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--opportunities", type=int, default=10000, help="org size, e.g. 1000 to 1000000")
+    parser.add_argument("--latency-ms", type=float, default=20, help="delay added to every API request")
+    parser.add_argument("--prefetch-calls-per-minute", type=int, default=0,
+                        help="enable background prefetching with this API call budget")
+    parser.add_argument("--think-ms", type=float, default=0, help="untimed pause after each interaction")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    # Baselines are kept per org size and latency, since both change every number
+    config = f"opportunities={args.opportunities},latency_ms={args.latency_ms:g}"
+    if args.prefetch_calls_per_minute:
+        config += f",prefetch_calls_per_minute={args.prefetch_calls_per_minute},think_ms={args.think_ms:g}"
+    baselines = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+
+    sys.path.insert(0, str(ROOT))
+    with tempfile.TemporaryDirectory() as directory:
+        server = FakeServer(directory, args.opportunities, args.latency_ms)
+        try:
+            secrets = app_secrets(server, directory, args.prefetch_calls_per_minute)
+            metrics = run_benchmarks(secrets, args.think_ms / 1000)
+        finally:
+            server.close()
+
+    print(f"Benchmark {config}")
+    regressions = compare(metrics, baselines.get(config, {}))
+    if args.update_baseline:
+        baselines[config] = metrics
+        BASELINE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline for {config} updated")
+    elif regressions:
+        print(f"{len(regressions)} metrics regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
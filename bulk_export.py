@@ -0,0 +1,191 @@
+import io
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Opportunity columns exported for pipeline-wide views and the dtypes they are parsed into
+EXPORT_DTYPES = {
+    "Id": "string",
+    "Name": "string",
+    "AccountId": "string",
+    "OwnerId": "string",
+    "StageName": "category",
+    "Region__c": "category",
+    "Segment__c": "category",
+    "CloseDate": "datetime64[ms]",
+    "Amount": "float64",
+    "Probability": "float64",
+    "IsClosed": "boolean",
+}
+
+# Same columns as a fixed Arrow schema, so every part file can be read back as one dataset
+EXPORT_SCHEMA = pa.schema([
+    ("Id", pa.string()),
+    ("Name", pa.string()),
+    ("AccountId", pa.string()),
+    ("OwnerId", pa.string()),
+    ("StageName", pa.dictionary(pa.int32(), pa.string())),
+    ("Region__c", pa.dictionary(pa.int32(), pa.string())),
+    ("Segment__c", pa.dictionary(pa.int32(), pa.string())),
+    ("CloseDate", pa.timestamp("ms")),
+    ("Amount", pa.float64()),
+    ("Probability", pa.float64()),
+    ("IsClosed", pa.bool_()),
+])
+
+# Salesforce keeps the results of a Bulk API 2.0 query job for 7 days
+RESULT_RETENTION = 7 * 24 * 3600
+
+OPEN_PIPELINE_QUERY = f"SELECT {', '.join(EXPORT_DTYPES)} FROM Opportunity WHERE IsClosed = false"
+
+
+def parse_csv_chunk(data):
+    """Parse one Bulk API CSV result chunk straight into a typed DataFrame."""
+    frame = pd.read_csv(
+        io.BytesIO(data),
+        dtype={name: dtype for name, dtype in EXPORT_DTYPES.items()
+               if dtype not in ("datetime64[ms]", "boolean")},
+        true_values=["true"],
+        false_values=["false"],
+        keep_default_na=False,
+        na_values=[""],
+    )
+    frame["CloseDate"] = pd.to_datetime(frame["CloseDate"], format="%Y-%m-%d").astype("datetime64[ms]")
+    frame["IsClosed"] = frame["IsClosed"].astype("boolean")
+    return frame
+
+
+class BulkQueryExport:
+    """Bulk API 2.0 query export written to Parquet part files.
+
+    Result chunks of ``chunk_rows`` rows are parsed and written one at a time, so
+    memory stays bounded by the chunk size however large the org is. Progress is kept
+    in a ``state.json`` next to the parts, which lets an interrupted export resume from
+    the last result locator for as long as Salesforce keeps the job results (7 days).
+    Once an export completes, older finished exports and interrupted ones past that
+    retention are deleted; a job that failed in Salesforce is deleted right away.
+    """
+
+    def __init__(self, connection, directory, chunk_rows=100000, poll_interval=2, timeout=3600):
+        self.connection = connection
+        self.directory = Path(directory)
+        self.chunk_rows = chunk_rows
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def _job_directory(self, job_id):
+        return self.directory / job_id
+
+    def _read_state(self, job_id):
+        with open(self._job_directory(job_id) / "state.json") as file:
+            return json.load(file)
+
+    def _write_state(self, state):
+        path = self._job_directory(state["job_id"]) / "state.json"
+        with open(path.with_suffix(".tmp"), "w") as file:
+            json.dump(state, file)
+        os.replace(path.with_suffix(".tmp"), path)
+
+    def _remove(self, job_id):
+        shutil.rmtree(self._job_directory(job_id), ignore_errors=True)
+
+    def _states(self):
+        if not self.directory.exists():
+            return []
+        return [self._read_state(path.parent.name) for path in self.directory.glob("*/state.json")]
+
+    def start(self, soql):
+        job = self.connection.request("POST", "jobs/query", json={"operation": "query", "query": soql}).json()
+        self._job_directory(job["id"]).mkdir(parents=True, exist_ok=True)
+        self._write_state({
+            "job_id": job["id"], "query": soql, "locator": None, "parts": 0, "rows": 0,
+            "total_rows": None, "complete": False, "created_at": time.time(), "finished_at": None,
+        })
+        return job["id"]
+
+    def _wait_for_job(self, job_id):
+        deadline = time.time() + self.timeout
+        while True:
+            job = self.connection.request("GET", f"jobs/query/{job_id}").json()
+            if job["state"] == "JobComplete":
+                return job
+            if job["state"] in ("Failed", "Aborted"):
+                # Nothing left to resume
+                self._remove(job_id)
+                raise RuntimeError(f"Bulk query job {job_id} {job['state'].lower()}: {job.get('errorMessage', '')}")
+            if time.time() > deadline:
+                raise TimeoutError(f"Bulk query job {job_id} didn't finish within {self.timeout} seconds")
+            time.sleep(self.poll_interval)
+
+    def resume(self, job_id, progress=None):
+        """Download the remaining result chunks of ``job_id``; ``progress(rows, total_rows)`` is called per chunk."""
+        state = self._read_state(job_id)
+        if state["complete"]:
+            return state
+
+        job = self._wait_for_job(job_id)
+        state["total_rows"] = job.get("numberRecordsProcessed")
+        while True:
+            params = {"maxRecords": self.chunk_rows}
+            if state["locator"]:
+                params["locator"] = state["locator"]
+            response = self.connection.request("GET", f"jobs/query/{job_id}/results",
+                                               params=params, headers={"Accept": "text/csv"})
+            if response.content.strip():
+                table = pa.Table.from_pandas(parse_csv_chunk(response.content), schema=EXPORT_SCHEMA,
+                                             preserve_index=False)
+                pq.write_table(table, self._job_directory(job_id) / f"part-{state['parts']:05d}.parquet")
+                state["parts"] += 1
+                state["rows"] += table.num_rows
+
+            # The part is on disk before the locator moves, so a crash just re-downloads this chunk
+            locator = response.headers.get("Sforce-Locator")
+            state["locator"] = None if locator in (None, "", "null") else locator
+            state["complete"] = state["locator"] is None
+            if state["complete"]:
+                state["finished_at"] = time.time()
+            self._write_state(state)
+            if progress:
+                progress(state["rows"], state["total_rows"])
+            if state["complete"]:
+                self.prune()
+                return state
+
+    def run(self, soql, progress=None):
+        return self.resume(self.start(soql), progress=progress)
+
+    def pending(self):
+        # Exports that were started but not fully downloaded and can still be resumed, newest first
+        now = time.time()
+        states = [s for s in self._states() if not s["complete"] and now - s["created_at"] <= RESULT_RETENTION]
+        return sorted(states, key=lambda s: s["created_at"], reverse=True)
+
+    def latest(self):
+        states = [s for s in self._states() if s["complete"]]
+        return max(states, key=lambda s: s["finished_at"], default=None)
+
+    def prune(self):
+        """Delete every finished export but the latest, and interrupted ones that can't be resumed anymore."""
+        latest = self.latest()
+        now = time.time()
+        for state in self._states():
+            if state["complete"]:
+                if state["job_id"] != latest["job_id"]:
+                    self._remove(state["job_id"])
+            elif now - state["created_at"] > RESULT_RETENTION:
+                self._remove(state["job_id"])
+
+    def read(self, job_id, columns=None):
+        """Load a finished export as a DataFrame with categorical StageName, Region__c and Segment__c."""
+        parts = sorted(self._job_directory(job_id).glob("part-*.parquet"))
+        if not parts:
+            return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in EXPORT_DTYPES.items()})[columns or list(EXPORT_DTYPES)]
+        table = ds.dataset(parts, schema=EXPORT_SCHEMA, format="parquet").to_table(columns=columns)
+        return table.to_pandas(types_mapper={pa.string(): pd.StringDtype()}.get)
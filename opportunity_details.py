@@ -0,0 +1,359 @@
+import contextvars
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from api_scheduler import ApiOverloaded
+
+# Opportunity with its parent Account fields
+OPPORTUNITY_QUERY = """
+SELECT Id, Name, CloseDate, StageName, Amount, Segment__c, Region__c, AccountId, Probability,
+       SystemModstamp, Account.SystemModstamp, Account.Name, Account.AccountNumber,
+       Account.Industry, Account.CustomerPriority__c, Account.Type, Account.Rating
+FROM Opportunity
+WHERE Id = '{opportunity_id}'
+"""
+
+# Same shape as OPPORTUNITY_QUERY but only the modstamps, used to revalidate cached results
+OPPORTUNITY_STAMP_QUERY = """
+SELECT Id, SystemModstamp, Account.SystemModstamp
+FROM Opportunity
+WHERE Id = '{opportunity_id}'
+"""
+
+# Latest Task and Event of the Opportunity
+ACTIVITY_QUERY = """
+SELECT Id,
+       (SELECT Id, SystemModstamp, Subject, Status, ActivityDate, Description, CreatedDate
+        FROM Tasks ORDER BY ActivityDate DESC NULLS LAST LIMIT 1),
+       (SELECT Id, SystemModstamp, Subject, ActivityDate, Description, CreatedDate
+        FROM Events ORDER BY ActivityDate DESC NULLS LAST LIMIT 1)
+FROM Opportunity
+WHERE Id = '{opportunity_id}'
+"""
+
+ACTIVITY_STAMP_QUERY = """
+SELECT Id,
+       (SELECT Id, SystemModstamp FROM Tasks ORDER BY ActivityDate DESC NULLS LAST LIMIT 1),
+       (SELECT Id, SystemModstamp FROM Events ORDER BY ActivityDate DESC NULLS LAST LIMIT 1)
+FROM Opportunity
+WHERE Id = '{opportunity_id}'
+"""
+
+# Contacts of the Account. The Account can be selected through the Opportunity with a
+# semi-join, so this doesn't have to wait for OPPORTUNITY_QUERY. The Account's other
+# Opportunities are loaded separately, only when their panel is opened (account_opportunities.py).
+ACCOUNT_QUERY = """
+SELECT Id, SystemModstamp,
+       (SELECT Id, SystemModstamp, Name, Email, Phone, Title FROM Contacts)
+FROM Account
+WHERE {condition}
+"""
+
+ACCOUNT_STAMP_QUERY = """
+SELECT Id, SystemModstamp,
+       (SELECT SystemModstamp FROM Contacts ORDER BY SystemModstamp DESC LIMIT 1)
+FROM Account
+WHERE Id = '{account_id}'
+"""
+
+# Related-record queries run in parallel on this many shared worker threads
+FETCH_WORKERS = 8
+DEFAULT_TIMEOUT = 15
+
+SALESFORCE_ID = re.compile(r"[a-zA-Z0-9]{15}(?:[a-zA-Z0-9]{3})?")
+
+
+def soql_id(record_id):
+    # Ids are interpolated into SOQL, so only accept well-formed ones
+    if not record_id or not SALESFORCE_ID.fullmatch(record_id):
+        raise ValueError(f"Invalid Salesforce Id: {record_id!r}")
+    return record_id
+
+
+@dataclass
+class OpportunityDetails:
+    """Everything the Opportunities Viewer renders for one selected Opportunity."""
+
+    id: str
+    name: str
+    close_date: str
+    stage_name: str
+    amount: float
+    segment: str
+    region: str
+    probability: float
+    account_id: str
+    account_name: str = "N/A"
+    account_number: str = "N/A"
+    industry: str = "N/A"
+    customer_priority: str = "N/A"
+    account_type: str = "N/A"
+    rating: str = "N/A"
+    contacts: list = field(default_factory=list)
+    recent_activity: dict = None
+    api_calls: int = 0
+    # Sections that failed to load ("account", "activity") and why; the rest still renders
+    errors: dict = field(default_factory=dict)
+    # Sections served from the cache without revalidation because Salesforce calls were shed
+    stale: list = field(default_factory=list)
+
+    @property
+    def primary_contact(self):
+        # The first contact is used as the default for the Deal Accelerator section
+        return self.contacts[0] if self.contacts else {}
+
+
+class CountingConnection:
+    """Wraps a connection and counts the query calls made through it."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self, call):
+        # Failed calls count too, unless the scheduler shed them before they reached Salesforce
+        shed = False
+        try:
+            return call()
+        except ApiOverloaded:
+            shed = True
+            raise
+        finally:
+            if not shed:
+                with self._lock:
+                    self.calls += 1
+
+    def query(self, soql, **kwargs):
+        return self._count(lambda: self.connection.query(soql, **kwargs))
+
+    def query_more(self, next_records_url, **kwargs):
+        return self._count(lambda: self.connection.query_more(next_records_url, **kwargs))
+
+
+def _value(record, key):
+    value = (record or {}).get(key)
+    return "N/A" if value is None else value
+
+
+def child_records(connection, record, relationship):
+    """Return all child records of a relationship subquery, following nextRecordsUrl."""
+    result = record.get(relationship) or {}
+    records = list(result.get("records", []))
+    while not result.get("done", True) and result.get("nextRecordsUrl"):
+        result = connection.query_more(result["nextRecordsUrl"])
+        records.extend(result.get("records", []))
+    return records
+
+
+def latest_activity(tasks, events):
+    # Combine Tasks and Events and keep the most recent one
+    activities = sorted(tasks + events, key=lambda x: x.get("ActivityDate") or "", reverse=True)
+    return activities[0] if activities else None
+
+
+def _stamp(record):
+    return (record or {}).get("SystemModstamp")
+
+
+def _opportunity_fingerprint(record):
+    return (_stamp(record), _stamp(record.get("Account")))
+
+
+def _activity_fingerprint(record):
+    # The displayed Task/Event is identified by its Id and modstamp
+    tasks = (record.get("Tasks") or {}).get("records", [])
+    events = (record.get("Events") or {}).get("records", [])
+    return (
+        tuple((t["Id"], _stamp(t)) for t in tasks),
+        tuple((e["Id"], _stamp(e)) for e in events),
+    )
+
+
+def _latest_stamp(records):
+    return max(filter(None, map(_stamp, records)), default=None)
+
+
+def _account_fingerprint(record, contacts):
+    return (_stamp(record), _latest_stamp(contacts))
+
+
+def _fetch_opportunity(connection, opportunity_id):
+    records = connection.query(OPPORTUNITY_QUERY.format(opportunity_id=opportunity_id)).get("records", [])
+    if not records:
+        raise LookupError(f"Opportunity {opportunity_id} not found")
+    return records[0], _opportunity_fingerprint(records[0])
+
+
+def _revalidate_opportunity(connection, opportunity_id):
+    records = connection.query(OPPORTUNITY_STAMP_QUERY.format(opportunity_id=opportunity_id)).get("records", [])
+    return _opportunity_fingerprint(records[0]) if records else None
+
+
+def _fetch_activity(connection, opportunity_id):
+    records = connection.query(ACTIVITY_QUERY.format(opportunity_id=opportunity_id)).get("records", [])
+    if not records:
+        return {"tasks": [], "events": []}, None
+    activity = {
+        "tasks": child_records(connection, records[0], "Tasks"),
+        "events": child_records(connection, records[0], "Events"),
+    }
+    return activity, _activity_fingerprint(records[0])
+
+
+def _revalidate_activity(connection, opportunity_id):
+    records = connection.query(ACTIVITY_STAMP_QUERY.format(opportunity_id=opportunity_id)).get("records", [])
+    return _activity_fingerprint(records[0]) if records else None
+
+
+def _fetch_account(connection, condition):
+    records = connection.query(ACCOUNT_QUERY.format(condition=condition)).get("records", [])
+    if not records:
+        return None, {"contacts": []}, None
+    contacts = child_records(connection, records[0], "Contacts")
+    return records[0]["Id"], {"contacts": contacts}, _account_fingerprint(records[0], contacts)
+
+
+def _revalidate_account(connection, account_id):
+    records = connection.query(ACCOUNT_STAMP_QUERY.format(account_id=account_id)).get("records", [])
+    if not records:
+        return None
+    record = records[0]
+    return _account_fingerprint(record, (record.get("Contacts") or {}).get("records", []))
+
+
+def _cached(cache, key, load, revalidate, stale=None):
+    if cache is None:
+        return load()[0]
+    try:
+        return cache.get_or_load(key, load, revalidate)
+    except ApiOverloaded:
+        # Shed load: an outdated value beats an empty page, as long as the caller says so
+        value = cache.peek(key)
+        if value is None or stale is None:
+            raise
+        stale.append(key[0])
+        return value
+
+
+def _load_account(connection, opportunity_id, account_id, cache, stale=None):
+    if account_id:
+        return _cached(
+            cache, ("Account", account_id),
+            lambda: _fetch_account(connection, f"Id = '{account_id}'")[1:],
+            lambda: _revalidate_account(connection, account_id),
+            stale,
+        )
+
+    # AccountId isn't known yet: select the Account through the Opportunity and cache it afterwards
+    account_id, related, stamp = _fetch_account(
+        connection, f"Id IN (SELECT AccountId FROM Opportunity WHERE Id = '{opportunity_id}')"
+    )
+    if cache is not None and account_id:
+        cache.put(("Account", account_id), related, stamp)
+    return related
+
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="salesforce-fetch")
+
+
+def fetch_parallel(calls, timeout=DEFAULT_TIMEOUT, executor=None):
+    """Run independent ``{name: callable}`` fetches concurrently on the shared pool, or on ``executor``.
+
+    Returns ``(results, errors)`` dicts keyed by name. A fetch that raises or doesn't
+    finish within ``timeout`` seconds lands in ``errors`` without affecting the others.
+    """
+    executor = executor or _executor
+    # Each fetch runs in a copy of the caller's context, so API metrics stay attributed to its page
+    futures = {name: executor.submit(contextvars.copy_context().run, call) for name, call in calls.items()}
+    wait(futures.values(), timeout=timeout)
+    results, errors = {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            errors[name] = TimeoutError(f"Timed out after {timeout} seconds")
+        elif future.exception() is not None:
+            errors[name] = future.exception()
+        else:
+            results[name] = future.result()
+    return results, errors
+
+
+def load_opportunity_details(connection, opportunity_id, cache=None, timeout=DEFAULT_TIMEOUT, executor=None):
+    """Load an Opportunity with its Account, Contacts and latest activity.
+
+    The Opportunity, its activity and its Account's related records are fetched in
+    parallel with relationship subqueries, so a selection costs at most three API calls
+    and about the latency of the slowest one. With a ``RecordCache`` the results are
+    shared across sessions and revalidated by SystemModstamp. Background work passes its
+    own ``executor`` so it doesn't queue up with the selections of the foreground.
+
+    Only a failure to load the Opportunity itself raises; failed activity or Account
+    queries are reported in ``OpportunityDetails.errors``. When the scheduler sheds a call,
+    whatever is cached is served instead and listed in ``OpportunityDetails.stale``.
+    """
+    connection = CountingConnection(connection)
+    opportunity_id = soql_id(opportunity_id)
+
+    # A cached Opportunity tells us the AccountId, which lets the Account entry be shared
+    cached_opportunity = cache.peek(("Opportunity", opportunity_id)) if cache is not None else None
+    account_id = cached_opportunity.get("AccountId") if cached_opportunity else None
+    if account_id:
+        account_id = soql_id(account_id)
+
+    stale = []
+    results, errors = fetch_parallel({
+        "opportunity": lambda: _cached(
+            cache, ("Opportunity", opportunity_id),
+            lambda: _fetch_opportunity(connection, opportunity_id),
+            lambda: _revalidate_opportunity(connection, opportunity_id),
+            stale,
+        ),
+        "activity": lambda: _cached(
+            cache, ("Activity", opportunity_id),
+            lambda: _fetch_activity(connection, opportunity_id),
+            lambda: _revalidate_activity(connection, opportunity_id),
+            stale,
+        ),
+        "account": lambda: _load_account(connection, opportunity_id, account_id, cache, stale),
+    }, timeout=timeout, executor=executor)
+
+    if "opportunity" in errors:
+        raise errors["opportunity"]
+    opportunity = results["opportunity"]
+    activity = results.get("activity", {"tasks": [], "events": []})
+    related = results.get("account", {"contacts": []})
+
+    details = build_opportunity_details(
+        opportunity, activity["tasks"], activity["events"], related["contacts"], api_calls=connection.calls
+    )
+    details.errors = {name: str(error) or type(error).__name__ for name, error in errors.items()}
+    details.stale = sorted(stale)
+    return details
+
+
+def build_opportunity_details(opportunity, tasks, events, contacts, api_calls=0):
+    # ``opportunity`` is shaped like an OPPORTUNITY_QUERY record, with the parent fields under "Account"
+    account = opportunity.get("Account") or {}
+    return OpportunityDetails(
+        id=opportunity["Id"],
+        name=opportunity["Name"],
+        close_date=opportunity["CloseDate"],
+        stage_name=opportunity["StageName"],
+        amount=opportunity["Amount"],
+        segment=_value(opportunity, "Segment__c"),
+        region=_value(opportunity, "Region__c"),
+        probability=opportunity.get("Probability"),
+        account_id=opportunity.get("AccountId"),
+        account_name=_value(account, "Name"),
+        account_number=_value(account, "AccountNumber"),
+        industry=_value(account, "Industry"),
+        customer_priority=_value(account, "CustomerPriority__c"),
+        account_type=_value(account, "Type"),
+        rating=_value(account, "Rating"),
+        contacts=contacts,
+        recent_activity=latest_activity(tasks, events),
+        api_calls=api_calls,
+    )
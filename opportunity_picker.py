@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+
+PICKER_FIELDS = "Id, Name, StageName, CloseDate, Amount, Region__c, Segment__c, Account.Name, Owner.Name"
+
+# Smallest and largest batch sizes Salesforce accepts in Sforce-Query-Options
+MIN_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 2000
+
+
+def escape_soql(value):
+    # Escape a value for use inside a single-quoted SOQL string literal
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def escape_like(value):
+    # LIKE wildcards must be escaped as well, so user input can't match everything
+    return escape_soql(value).replace("%", "\\%").replace("_", "\\_")
+
+
+@dataclass(frozen=True)
+class PickerFilters:
+    search: str = ""
+    stage: str = None
+    region: str = None
+    segment: str = None
+    owner: str = ""
+
+
+def build_picker_query(filters):
+    conditions = []
+    if filters.search.strip():
+        conditions.append(f"Name LIKE '%{escape_like(filters.search.strip())}%'")
+    if filters.stage:
+        conditions.append(f"StageName = '{escape_soql(filters.stage)}'")
+    if filters.region:
+        conditions.append(f"Region__c = '{escape_soql(filters.region)}'")
+    if filters.segment:
+        conditions.append(f"Segment__c = '{escape_soql(filters.segment)}'")
+    if filters.owner.strip():
+        conditions.append(f"Owner.Name LIKE '%{escape_like(filters.owner.strip())}%'")
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT {PICKER_FIELDS} FROM Opportunity {where} ORDER BY Name, Id"
+
+
+@dataclass
+class PickerPage:
+    records: list
+    next_records_url: str = None
+    total_size: int = 0
+
+
+def fetch_picker_page(connection, filters, cursor=None, page_size=MIN_PAGE_SIZE):
+    """Fetch one page of matching Opportunities.
+
+    The first page runs the query, later pages follow the ``nextRecordsUrl`` cursor
+    returned with the previous page, so only the visible page is ever transferred.
+    """
+    page_size = max(MIN_PAGE_SIZE, min(page_size, MAX_PAGE_SIZE))
+    headers = {"Sforce-Query-Options": f"batchSize={page_size}"}
+    if cursor is None:
+        result = connection.query(build_picker_query(filters), headers=headers)
+    else:
+        result = connection.query_more(cursor, headers=headers)
+    return PickerPage(
+        records=result.get("records", []),
+        next_records_url=None if result.get("done", True) else result.get("nextRecordsUrl"),
+        total_size=result.get("totalSize", 0),
+    )
+
+
+def picklist_values(describe_result, field_name):
+    # Active picklist values of a field from an sObject describe, or [] if the field is missing
+    for field_description in describe_result.get("fields", []):
+        if field_description["name"] == field_name:
+            return [value["value"] for value in field_description.get("picklistValues", []) if value.get("active")]
+    return []
+
+
+def picker_label(record):
+    account = (record.get("Account") or {}).get("Name") or "No Account"
+    return f"{record['Name']} · {account} · {record.get('StageName')} · {record.get('CloseDate')}"
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from api_metrics import api_call_context
+from opportunity_details import load_opportunity_details
+
+logger = logging.getLogger(__name__)
+
+# API calls of a typical detail bundle (Opportunity, activity and Account queries). A
+# bundle is only started with this much budget left, but revalidations and extra pages
+# can cost more; every call is charged as it's made and the bundle stops at the budget.
+CALLS_PER_BUNDLE = 3
+
+# Prefetch queries of all sessions run on their own small pool, so they never queue up
+# in front of the foreground selections on opportunity_details' shared pool
+PREFETCH_WORKERS = 2
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch-fetch")
+
+
+class PrefetchBudgetExceeded(Exception):
+    pass
+
+
+class _BudgetedConnection:
+    """Charges every query to the prefetcher's budget before making it."""
+
+    def __init__(self, connection, prefetcher):
+        self.connection = connection
+        self.prefetcher = prefetcher
+
+    def query(self, soql, **kwargs):
+        self.prefetcher._charge()
+        return self.connection.query(soql, **kwargs)
+
+    def query_more(self, next_records_url, **kwargs):
+        self.prefetcher._charge()
+        return self.connection.query_more(next_records_url, **kwargs)
+
+
+def prefetch_candidates(selected_id, picker_records, siblings=(), neighbors=2):
+    """Opportunity Ids a rep is likely to open after ``selected_id``, most likely first.
+
+    That's the next ``neighbors`` entries of the picker page, then the previous one,
+    then the Account's other Opportunities that were already listed.
+    """
+    ids = [record["Id"] for record in picker_records]
+    candidates = []
+    if selected_id in ids:
+        position = ids.index(selected_id)
+        candidates += ids[position + 1:position + 1 + neighbors]
+        candidates += ids[max(position - 1, 0):position]
+    candidates += [record["Id"] for record in siblings]
+    # Keep the first occurrence of each Id, without the selected one
+    return [i for i in dict.fromkeys(candidates) if i != selected_id]
+
+
+class Prefetcher:
+    """Warms the record cache with detail bundles in the background, for one browser session.
+
+    ``schedule()`` replaces the queue with the Opportunities to warm next and bumps a
+    generation counter; work queued for an earlier selection is dropped as soon as the
+    worker notices. The worker spends at most ``calls_per_minute`` API calls in any
+    sliding minute and exits after ``idle_timeout`` seconds without work. A budget below
+    ``CALLS_PER_BUNDLE`` is raised to it, since no bundle could ever start with less.
+    """
+
+    def __init__(self, connection, cache, calls_per_minute=30, session="unknown", idle_timeout=300):
+        self.connection = connection
+        self.cache = cache
+        if calls_per_minute < CALLS_PER_BUNDLE:
+            logger.warning("Prefetch budget of %s calls per minute raised to %s, one detail bundle",
+                           calls_per_minute, CALLS_PER_BUNDLE)
+        self.calls_per_minute = max(calls_per_minute, CALLS_PER_BUNDLE)
+        self.session = session
+        self.idle_timeout = idle_timeout
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._generation = 0
+        self._calls = deque()  # Timestamps of the API calls made in the last minute
+        self._thread = None
+        self.prefetched = 0
+        self.cancelled = 0
+
+    def schedule(self, opportunity_ids):
+        with self._condition:
+            self._generation += 1
+            self.cancelled += len(self._queue)
+            self._queue = deque((self._generation, i) for i in opportunity_ids)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def calls_last_minute(self):
+        with self._condition:
+            return self._spent(time.time())
+
+    def _spent(self, now):
+        while self._calls and now - self._calls[0] >= 60:
+            self._calls.popleft()
+        return len(self._calls)
+
+    def _charge(self):
+        # Called from the fetch threads right before each API call
+        with self._condition:
+            now = time.time()
+            if self._spent(now) >= self.calls_per_minute:
+                raise PrefetchBudgetExceeded(f"Prefetch budget of {self.calls_per_minute} calls per minute used up")
+            self._calls.append(now)
+
+    def _next(self):
+        # Next queued Id of the current generation once the budget allows it, or None when idle
+        with self._condition:
+            while True:
+                if not self._queue:
+                    if not self._condition.wait(timeout=self.idle_timeout) and not self._queue:
+                        self._thread = None
+                        return None
+                    continue
+                generation, opportunity_id = self._queue[0]
+                now = time.time()
+                if self._spent(now) + CALLS_PER_BUNDLE <= self.calls_per_minute:
+                    self._queue.popleft()
+                    return generation, opportunity_id
+                # Wait for the oldest calls to leave the window, or for a new selection
+                self._condition.wait(timeout=60 - (now - self._calls[0]) if self._calls else 60)
+
+    def _run(self):
+        with api_call_context("Prefetch", self.session):
+            while True:
+                item = self._next()
+                if item is None:
+                    return
+                generation, opportunity_id = item
+                if generation != self._generation:
+                    continue
+                try:
+                    details = load_opportunity_details(_BudgetedConnection(self.connection, self), opportunity_id,
+                                                       cache=self.cache, executor=_executor)
+                except Exception as e:
+                    logger.info("Prefetching %s failed: %s", opportunity_id, e)
+                    continue
+                if details.errors:
+                    logger.info("Prefetched %s partly: %s", opportunity_id, details.errors)
+                    continue
+                with self._condition:
+                    self.prefetched += 1
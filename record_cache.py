@@ -0,0 +1,119 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class _Entry:
+    value: object
+    stamp: object
+    size: int
+    fetched_at: float
+    validated_at: float
+
+
+class RecordCache:
+    """Process-wide LRU cache of Salesforce results with TTL and SystemModstamp revalidation.
+
+    Entries are fresh for ``ttl`` seconds. After that the cache asks the caller for
+    the current modstamp fingerprint (a cheap query) and only reloads the value when
+    it changed. Entries older than ``max_age`` are always reloaded, which also picks
+    up deletions that don't move any modstamp. The total pickled size of the cached
+    values is kept under ``max_bytes`` by evicting the least recently used entries.
+    """
+
+    def __init__(self, ttl=300, max_bytes=64 * 1024 * 1024, max_age=3600):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, load, revalidate=None):
+        """Return the cached value for ``key``.
+
+        ``load()`` must return ``(value, stamp)`` and ``revalidate()`` the current
+        stamp, which is compared with the one stored alongside the value.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry.validated_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                if revalidate is None or now - entry.fetched_at >= self.max_age:
+                    entry = None
+
+        if entry is not None:
+            stamp = revalidate()
+            with self._lock:
+                self.revalidations += 1
+                if stamp == entry.stamp and self._entries.get(key) is entry:
+                    entry.validated_at = time.time()
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+
+        with self._lock:
+            self.misses += 1
+        value, stamp = load()
+        self.put(key, value, stamp)
+        return value
+
+    def put(self, key, value, stamp=None):
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        now = time.time()
+        with self._lock:
+            self._discard(key)
+            # Values that can never fit are simply not cached
+            if size > self.max_bytes:
+                return
+            self._entries[key] = _Entry(value, stamp, size, now, now)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def peek(self, key):
+        # Return whatever is cached, however old, without touching the statistics
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def invalidate(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Recommended resources per Account industry, as file names inside the resources directory
+INDUSTRY_RESOURCES = {
+    "Technology": ["Tech_Whitepaper.pdf"],
+    "Healthcare": ["Healthcare_Report.pdf", "Clinical_Case_Study.pdf"],
+    "Financial Services": ["Financial_Insights.pdf", "Banking_Case_Study.pdf"],
+    "Electronics": ["Electronics_Industry.pdf"],
+    "Apparel": ["THE GLOBAL APPAREL VALUE CHAIN.pdf"],
+    "Construction": ["Construction Industry.pdf"],
+    "Consulting": ["Consulting_Strategies.pdf"],
+    "Hospitality": ["Hospitality_Insights.pdf", "Hospitality Sectors.pdf"],
+    "Energy": ["Energy Sector Overview.pdf", "Renewable_Energy.pdf"],
+    "Transportation": ["Future of transportation.pdf", "Logistics_Overview.pdf"],
+    "Education": ["Education_Whitepaper.pdf", "HighEdu_Trends.pdf"],
+    "Biotechnology": ["Biotech_Trends.pdf", "Biotech_Report.pdf"],
+    "Entertainment": ["Entertainment_Economics.pdf", "Media_Insights.pdf"],
+}
+
+
+@dataclass(frozen=True)
+class Resource:
+    name: str
+    path: Path
+    size: int
+    sha256: str
+
+
+def _sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResourceCatalog:
+    """Index of the PDF collateral in the resources directory.
+
+    The directory is scanned once; file contents are only read when a download is
+    requested and are kept in an LRU cache bounded to ``max_cache_bytes`` that every
+    session shares.
+    """
+
+    def __init__(self, directory, industry_resources=INDUSTRY_RESOURCES, max_cache_bytes=32 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_cache_bytes = max_cache_bytes
+        self.resources = {
+            path.name: Resource(path.name, path, path.stat().st_size, _sha256(path))
+            for path in sorted(self.directory.glob("*.pdf"))
+        }
+
+        # Validate the industry mapping up front instead of failing on open()
+        self.industry_resources = {}
+        self.missing = {}
+        for industry, names in industry_resources.items():
+            self.industry_resources[industry] = [self.resources[n] for n in names if n in self.resources]
+            missing = [n for n in names if n not in self.resources]
+            if missing:
+                self.missing[industry] = missing
+                logger.warning("Resources listed for %s are missing from %s: %s",
+                               industry, self.directory, ", ".join(missing))
+
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+    def for_industry(self, industry):
+        return self.industry_resources.get(industry, [])
+
+    def read(self, resource):
+        with self._lock:
+            data = self._cache.get(resource.sha256)
+            if data is not None:
+                self._cache.move_to_end(resource.sha256)
+                return data
+
+        data = resource.path.read_bytes()
+        if len(data) <= self.max_cache_bytes:
+            with self._lock:
+                if resource.sha256 not in self._cache:
+                    self._cache[resource.sha256] = data
+                    self._cache_bytes += len(data)
+                while self._cache_bytes > self.max_cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_bytes -= len(evicted)
+        return data
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Next step recommended for each Opportunity stage
+NEXT_STEPS = {
+    "Closed Won": "Celebrate the win and ensure smooth implementation or delivery for the client. Gather testimonials or case studies if applicable.",
+    "Perception Analysis": "Engage the client with proof points such as case studies or ROI analyses to build confidence.",
+    "Negotiation/Review": "Focus on addressing any legal or procurement concerns. Align with key decision-makers to finalize terms.",
+    "Id. Decision Makers": "Identify all stakeholders involved in the decision-making process and establish a clear buying timeline.",
+    "Qualification": "Verify the client's budget, timeline, and decision-making process to ensure alignment with your solution.",
+    "Value Proposition": "Highlight your unique selling points and how they directly address the client's specific needs.",
+    "Prospecting": "Research the client's business challenges and identify initial points of contact to establish rapport.",
+    "Needs Analysis": "Conduct detailed discovery sessions to fully understand the client's pain points and tailor your solution.",
+    "Proposal/Price Quote": "Present a well-structured proposal with clear pricing. Emphasize value over cost to address potential objections.",
+}
+DEFAULT_NEXT_STEP = "Follow up with the client and provide any requested information."
+
+CRITICAL_STAGES = ["Proposal/Price Quote", "Negotiation/Review"]
+LOW_PROBABILITY = 50
+CRITICAL_STAGE_PROBABILITY = 70
+CLOSING_SOON_DAYS = 7
+HIGH_VALUE_AMOUNT = 100000
+
+# Risk categories from most to least urgent; the first matching rule wins
+LOW_PROBABILITY_RISK = "Low Probability"
+OVERDUE_RISK = "Overdue"
+CLOSING_SOON_RISK = "Closing Soon"
+CRITICAL_STAGE_RISK = "Critical Stage"
+ON_TRACK = "On Track"
+RISK_CATEGORIES = [LOW_PROBABILITY_RISK, OVERDUE_RISK, CLOSING_SOON_RISK, CRITICAL_STAGE_RISK, ON_TRACK]
+
+# Message and recommended action per risk category; {days} is the number of days to close
+RISK_MESSAGES = {
+    LOW_PROBABILITY_RISK: (
+        "This opportunity has a low win probability. {days} days remain until the close date. Consider re-engaging the client or revising the proposal.",
+        "Focus on strengthening the value proposition and addressing client objections.",
+    ),
+    OVERDUE_RISK: (
+        "This opportunity is overdue. Follow up with the client immediately.",
+        "Contact the client to understand any blockers and discuss the next steps.",
+    ),
+    CLOSING_SOON_RISK: (
+        "This opportunity is nearing its close date with {days} days remaining. Ensure all client concerns are addressed promptly.",
+        "Schedule a final meeting with the client to confirm alignment.",
+    ),
+    CRITICAL_STAGE_RISK: (
+        "This opportunity is in a critical stage with {days} days remaining and moderate win probability. Review terms and address objections.",
+        "Conduct a detailed review of the proposal or contract terms and ensure client satisfaction.",
+    ),
+    ON_TRACK: (
+        "This opportunity is on track with {days} days remaining.",
+        "Maintain consistent communication and monitor progress closely.",
+    ),
+}
+HIGH_VALUE_INSIGHT = "This is a high-value opportunity. Consider prioritizing resources to maximize chances of success."
+
+
+def score_pipeline(opportunities, now=None):
+    """Score a DataFrame of Opportunities in one vectorized pass.
+
+    Expects ``CloseDate``, ``StageName``, ``Probability`` and ``Amount`` columns and returns
+    a copy with ``days_to_close``, ``is_overdue``, ``risk_category``, ``risk_rank`` (0 is the
+    most urgent), ``high_value`` and ``next_step`` added.
+    """
+    now = pd.Timestamp.now() if now is None else now
+    scored = opportunities.copy()
+
+    close_date = pd.to_datetime(scored["CloseDate"], errors="coerce")
+    probability = pd.to_numeric(scored["Probability"], errors="coerce")
+    amount = pd.to_numeric(scored["Amount"], errors="coerce")
+
+    days_to_close = (close_date - now).dt.days
+    is_overdue = close_date < now
+    critical_stage = scored["StageName"].isin(CRITICAL_STAGES)
+
+    # Missing values compare as False, so an Opportunity without a probability isn't flagged as low
+    conditions = [
+        (probability < LOW_PROBABILITY).to_numpy(),
+        is_overdue.to_numpy(),
+        (days_to_close <= CLOSING_SOON_DAYS).to_numpy(),
+        (critical_stage & (probability < CRITICAL_STAGE_PROBABILITY)).to_numpy(),
+    ]
+    risk_rank = np.select(conditions, np.arange(len(conditions)), default=len(conditions))
+
+    scored["days_to_close"] = days_to_close.astype("Int64")
+    scored["is_overdue"] = is_overdue
+    scored["risk_rank"] = risk_rank
+    scored["risk_category"] = pd.Categorical.from_codes(risk_rank, categories=RISK_CATEGORIES, ordered=True)
+    scored["high_value"] = (amount > HIGH_VALUE_AMOUNT).fillna(False)
+    scored["next_step"] = scored["StageName"].map(NEXT_STEPS).fillna(DEFAULT_NEXT_STEP)
+    return scored
+
+
+def rank_pipeline(scored):
+    # Most urgent first, and the biggest deals first within a risk category
+    return scored.sort_values(["risk_rank", "Amount"], ascending=[True, False], na_position="last")
+
+
+def risk_analysis(scored_row):
+    """Return the risk message, recommended action and high-value insight (or None) for one scored row."""
+    message, action = RISK_MESSAGES[scored_row["risk_category"]]
+    insight = HIGH_VALUE_INSIGHT if scored_row["high_value"] else None
+    return message.format(days=scored_row["days_to_close"]), action, insight
@@ -0,0 +1,198 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from simple_salesforce import Salesforce, SalesforceLogin
+from simple_salesforce.exceptions import SalesforceExpiredSession
+
+from api_metrics import operation_name
+from api_scheduler import ApiOverloaded
+from single_flight import SingleFlight
+
+
+class _SalesforceSession(requests.Session):
+    """``requests.Session`` with a default timeout, which requests itself doesn't have.
+
+    ``verify`` is passed with every request too: requests lets REQUESTS_CA_BUNDLE override
+    ``Session.verify``, but not a ``verify`` given to the request itself. The environment
+    still applies otherwise, e.g. HTTPS_PROXY, NO_PROXY and .netrc.
+    """
+
+    def __init__(self, timeout, verify=True):
+        super().__init__()
+        self.timeout = timeout
+        self.verify = verify
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("verify", self.verify)
+        return super().request(method, url, **kwargs)
+
+
+class SalesforceConnection:
+    """One authenticated Salesforce session shared by every browser session.
+
+    The login happens lazily on first use and all REST calls go through a
+    pooled keep-alive ``requests.Session``. When Salesforce reports that the
+    session has expired the connection logs in again and retries the call once.
+    Every request has a ``(connect, read)`` ``timeout`` in seconds, so a stalled
+    connection can't hold a worker thread forever.
+
+    Instead of a username and password, an existing ``session_id`` (e.g. an OAuth
+    access token) and ``instance_url`` can be given; such sessions can't be renewed.
+
+    Identical reads (query, query_more, describe) made at the same time, e.g. by
+    several browser sessions opening the same Opportunity, share one request. Each
+    coalesced call is reported to ``deduplication_hooks`` with its operation name.
+
+    With an ``ApiScheduler`` every call first waits for its budget and transient errors
+    (limits, 503s) are retried with backoff; see ``api_scheduler``.
+    """
+
+    def __init__(self, username=None, password=None, security_token=None, domain=None,
+                 pool_size=10, login_retry_interval=30, response_hooks=(),
+                 instance_url=None, session_id=None, verify=True, deduplication_hooks=(),
+                 scheduler=None, timeout=(5, 15)):
+        self.username = username
+        self._password = password
+        self._security_token = security_token
+        self.domain = domain
+        self.instance_url = instance_url
+        self._session_id = session_id
+        self.login_retry_interval = login_retry_interval
+
+        # Keep-alive connection pool shared by all Salesforce calls
+        # verify is True, False or the path of a CA bundle, e.g. for a private CA or a test instance
+        self.http_session = _SalesforceSession(timeout, verify)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http_session.mount("https://", adapter)
+        # e.g. ApiMetrics.response_hook, called for every response including the login
+        self.http_session.hooks["response"].extend(response_hooks)
+
+        # Identical reads in flight share one request; e.g. ApiMetrics.deduplication_hook
+        self.single_flight = SingleFlight()
+        self.deduplication_hooks = list(deduplication_hooks)
+        # Callers waiting for an identical call give up after about what the call itself may take
+        self.coalesce_timeout = 2 * sum(timeout)
+        self.scheduler = scheduler
+
+        self._lock = threading.Lock()
+        self._sf = None
+        self.instance = None
+        self.login_count = 0
+        self.connected_at = None
+        self.last_login_attempt = None
+        self.last_error = None
+
+    def _login(self):
+        if self._session_id:
+            self._sf = Salesforce(instance_url=self.instance_url, session_id=self._session_id,
+                                  session=self.http_session)
+            self.instance = self._sf.sf_instance
+        else:
+            session_id, instance = SalesforceLogin(
+                username=self.username,
+                password=self._password,
+                security_token=self._security_token,
+                domain=self.domain,
+                session=self.http_session
+            )
+            self._sf = Salesforce(instance=instance, session_id=session_id, session=self.http_session)
+            self.instance = instance
+        self.login_count += 1
+        self.connected_at = time.time()
+        self.last_error = None
+
+    def _ensure_client(self, stale_client=None):
+        with self._lock:
+            # Another thread may have logged in while we were waiting for the lock
+            if self._sf is not None and self._sf is not stale_client:
+                return self._sf
+
+            # Don't hammer the login endpoint when the credentials are broken
+            now = time.time()
+            if (self._sf is None and self.last_error is not None
+                    and now - self.last_login_attempt < self.login_retry_interval):
+                raise ConnectionError(f"Failed to connect to Salesforce: {self.last_error}")
+
+            self.last_login_attempt = now
+            try:
+                self._login()
+            except Exception as e:
+                self._sf = None
+                self.last_error = e
+                raise
+            return self._sf
+
+    def is_connected(self):
+        try:
+            self._ensure_client()
+        except Exception:
+            return False
+        return True
+
+    def status(self):
+        return {
+            "connected": self._sf is not None,
+            "instance": self.instance,
+            "username": self.username,
+            "logins": self.login_count,
+            "connected_at": self.connected_at,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+    def call(self, operation, idempotent=True):
+        """Run ``operation(sf)`` and re-authenticate once if the session expired.
+
+        Raises ``ApiOverloaded`` when the scheduler sheds the call. Only ``idempotent``
+        calls are retried after transient errors.
+        """
+        # Logging in happens outside the scheduler, so a login failure isn't retried as overload
+        sf = self._ensure_client()
+        try:
+            return self._scheduled(lambda: operation(sf), idempotent)
+        except SalesforceExpiredSession:
+            sf = self._ensure_client(stale_client=sf)
+            return self._scheduled(lambda: operation(sf), idempotent)
+
+    def _scheduled(self, call, idempotent):
+        if self.scheduler is None:
+            return call()
+        return self.scheduler.run(call, retry=idempotent)
+
+    def _coalesced(self, name, key, operation):
+        # A shed call was charged to the budget of the session that made it; one of the
+        # sessions that were waiting for it tries again on its own budget, the rest wait again
+        result, shared = self.single_flight.do(key, lambda: self.call(operation), timeout=self.coalesce_timeout,
+                                               retry_on=ApiOverloaded)
+        if shared:
+            for hook in self.deduplication_hooks:
+                hook(name)
+        return result
+
+    def query(self, soql, **kwargs):
+        # Named the way api_metrics.operation_name names the request, so both end up in one row
+        name = "GET queryAll" if kwargs.get("include_deleted") else "GET query"
+        return self._coalesced(name, ("query", soql, _frozen(kwargs)), lambda sf: sf.query(soql, **kwargs))
+
+    def query_more(self, next_records_url, **kwargs):
+        return self._coalesced(operation_name("GET", next_records_url),
+                               ("query_more", next_records_url, _frozen(kwargs)),
+                               lambda sf: sf.query_more(next_records_url, identifier_is_url=True, **kwargs))
+
+    def describe(self, sobject):
+        return self._coalesced(f"GET sobjects/{sobject}/describe", ("describe", sobject),
+                               lambda sf: getattr(sf, sobject).describe())
+
+    def request(self, method, path, **kwargs):
+        # Raw REST call relative to the versioned data URL, for endpoints without a helper (e.g. Bulk API 2.0).
+        # Not coalesced and only retried for GET, since the others may change data (e.g. creating a job)
+        return self.call(lambda sf: sf._call_salesforce(method, sf.base_url + path, name=path, **kwargs),
+                         idempotent=method.upper() == "GET")
+
+
+def _frozen(kwargs):
+    # Hashable form of keyword arguments such as headers={"Sforce-Query-Options": ...}
+    return tuple(sorted((name, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+                        for name, value in kwargs.items()))
@@ -0,0 +1,66 @@
+import threading
+import time
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces identical calls that run at the same time into one.
+
+    The first caller of ``do(key, load)`` runs ``load()``; callers with the same key that
+    arrive while it's running wait for it and get the same result, or the same exception.
+    Nothing is remembered once the call finished, that's what the record cache is for.
+    Waiting callers give up with ``TimeoutError`` after ``timeout`` seconds. When the
+    call failed with one of the ``retry_on`` exceptions, they start over: one of them
+    runs ``load()`` again and the others wait for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    def do(self, key, load, timeout=None, retry_on=()):
+        """Return ``(result, shared)``; ``shared`` tells whether another caller ran ``load()``."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.calls += 1
+            if leader:
+                break
+
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not flight.done.wait(remaining):
+                raise TimeoutError(f"Gave up waiting for an identical call after {timeout} seconds")
+            if retry_on and isinstance(flight.error, retry_on):
+                continue
+            with self._lock:
+                self.deduplicated += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = load()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "deduplicated": self.deduplicated, "in_flight": len(self._flights)}
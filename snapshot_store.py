@@ -0,0 +1,294 @@
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from opportunity_details import build_opportunity_details
+from opportunity_picker import MIN_PAGE_SIZE, PickerPage
+
+# Fields replicated per object; relationship fields are stored flattened (Owner.Name -> Owner_Name)
+SNAPSHOT_FIELDS = {
+    "Account": ["Id", "Name", "AccountNumber", "Industry", "CustomerPriority__c", "Type", "Rating",
+                "SystemModstamp"],
+    "Opportunity": ["Id", "Name", "CloseDate", "StageName", "Amount", "Segment__c", "Region__c", "AccountId",
+                    "Probability", "IsClosed", "OwnerId", "Owner.Name", "SystemModstamp"],
+    "Contact": ["Id", "AccountId", "Name", "Email", "Phone", "Title", "SystemModstamp"],
+    "Task": ["Id", "WhatId", "Subject", "Status", "ActivityDate", "Description", "CreatedDate", "SystemModstamp"],
+    "Event": ["Id", "WhatId", "Subject", "ActivityDate", "Description", "CreatedDate", "SystemModstamp"],
+}
+
+# (field, value) a record needs to be replicated; only the activities of Opportunities are shown.
+# The full load filters on it. Delta syncs fetch every changed record and delete the ones that
+# no longer match, e.g. a Task moved from an Opportunity to a Case.
+SNAPSHOT_SCOPES = {
+    "Task": ("What.Type", "Opportunity"),
+    "Event": ("What.Type", "Opportunity"),
+}
+
+NUMERIC_FIELDS = {"Amount", "Probability"}
+BOOLEAN_FIELDS = {"IsClosed"}
+
+# Incremental syncs re-read this far behind the watermark. A long transaction can commit
+# a record with a SystemModstamp older than records already synced; upserts are idempotent.
+SYNC_OVERLAP = timedelta(minutes=5)
+
+INDEXES = {
+    "Opportunity": ["AccountId", "Name"],
+    "Contact": ["AccountId"],
+    "Task": ["WhatId"],
+    "Event": ["WhatId"],
+}
+
+
+def _column(field_name):
+    return field_name.replace(".", "_")
+
+
+def _column_type(field_name):
+    if field_name in NUMERIC_FIELDS:
+        return "REAL"
+    return "INTEGER" if field_name in BOOLEAN_FIELDS else "TEXT"
+
+
+def _flatten(record, field_name):
+    value = record
+    for part in field_name.split("."):
+        value = (value or {}).get(part)
+    return value
+
+
+def _soql_datetime(modstamp, earlier=timedelta(0)):
+    # SOQL datetime literals don't accept milliseconds; re-fetching the same second is harmless
+    parsed = datetime.strptime(modstamp[:19], "%Y-%m-%dT%H:%M:%S") - earlier
+    return parsed.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SnapshotStore:
+    """Local SQLite replica of Opportunity, Account, Contact, Task and Event.
+
+    ``sync()`` does a full load the first time and afterwards only fetches records
+    whose SystemModstamp moved past the stored watermark, minus ``SYNC_OVERLAP``. Deletes
+    are picked up with queryAll and IsDeleted, as long as the sync runs before the
+    recycle bin is purged.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._sync_lock = threading.Lock()
+        self.last_sync_error = None
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state "
+                "(object TEXT PRIMARY KEY, watermark TEXT, synced_at REAL)"
+            )
+            for sobject, fields in SNAPSHOT_FIELDS.items():
+                columns = ", ".join(
+                    f"{_column(name)} {_column_type(name)}" + (" PRIMARY KEY" if name == "Id" else "")
+                    for name in fields
+                )
+                db.execute(f"CREATE TABLE IF NOT EXISTS {sobject} ({columns})")
+                # Fields added since the snapshot was created get a column and a full reload to fill it
+                existing = {row["name"] for row in db.execute(f"PRAGMA table_info({sobject})")}
+                missing = [name for name in fields if _column(name) not in existing]
+                for name in missing:
+                    db.execute(f"ALTER TABLE {sobject} ADD COLUMN {_column(name)} {_column_type(name)}")
+                if missing:
+                    db.execute("DELETE FROM sync_state WHERE object = ?", (sobject,))
+                for column in INDEXES.get(sobject, []):
+                    db.execute(f"CREATE INDEX IF NOT EXISTS {sobject}_{column} ON {sobject} ({column})")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        return db
+
+    # Sync
+
+    def sync(self, connection, blocking=True):
+        """Bring the replica up to date and return the number of rows inserted, updated or deleted.
+
+        With ``blocking=False`` this returns None right away when another sync is running.
+        """
+        if not self._sync_lock.acquire(blocking=blocking):
+            return None
+        try:
+            changed = sum(self._sync_object(connection, sobject) for sobject in SNAPSHOT_FIELDS)
+        except Exception as e:
+            self.last_sync_error = e
+            raise
+        finally:
+            self._sync_lock.release()
+        self.last_sync_error = None
+        return changed
+
+    def is_syncing(self):
+        return self._sync_lock.locked()
+
+    def _sync_object(self, connection, sobject):
+        fields = SNAPSHOT_FIELDS[sobject]
+        columns = [_column(name) for name in fields]
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT watermark FROM sync_state WHERE object = ?", (sobject,)).fetchone()
+        watermark = row["watermark"] if row else None
+
+        scope = SNAPSHOT_SCOPES.get(sobject)
+        selected = fields + ["IsDeleted"] + ([scope[0]] if scope else [])
+        if watermark:
+            conditions = [f"SystemModstamp > {_soql_datetime(watermark, SYNC_OVERLAP)}"]
+        else:
+            conditions = [f"{scope[0]} = '{scope[1]}'"] if scope else []
+        soql = f"SELECT {', '.join(selected)} FROM {sobject}"
+        if conditions:
+            soql += f" WHERE {' AND '.join(conditions)}"
+        soql += " ORDER BY SystemModstamp"
+
+        def removed(record):
+            return record.get("IsDeleted") or (scope is not None and _flatten(record, scope[0]) != scope[1])
+
+        # Only rows whose values differ are written, so records re-read in the overlap aren't counted
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != "Id")
+        differs = " OR ".join(f"{column} IS NOT excluded.{column}" for column in columns if column != "Id")
+        upsert = (f"INSERT INTO {sobject} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+                  f"ON CONFLICT (Id) DO UPDATE SET {updates} WHERE {differs}")
+        result = connection.query(soql, include_deleted=True)
+        with closing(self._connect()) as db:
+            changes_before = db.total_changes
+            while True:
+                records = result.get("records", [])
+                with db:
+                    db.executemany(f"DELETE FROM {sobject} WHERE Id = ?",
+                                   [(r["Id"],) for r in records if removed(r)])
+                    db.executemany(upsert, [tuple(_flatten(r, name) for name in fields)
+                                            for r in records if not removed(r)])
+                if records:
+                    watermark = max(watermark or "", max(r["SystemModstamp"] for r in records))
+                if result.get("done", True):
+                    break
+                result = connection.query_more(result["nextRecordsUrl"])
+            changed = db.total_changes - changes_before
+
+            # The watermark only moves once the whole object is synced, so an interrupted
+            # sync is simply repeated next time
+            with db:
+                db.execute("INSERT OR REPLACE INTO sync_state (object, watermark, synced_at) VALUES (?, ?, ?)",
+                           (sobject, watermark, time.time()))
+        return changed
+
+    def last_synced_at(self):
+        # Time of the oldest per-object sync, or None until every object has been loaded once
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT synced_at FROM sync_state").fetchall()
+        if len(rows) < len(SNAPSHOT_FIELDS):
+            return None
+        return min(row["synced_at"] for row in rows)
+
+    def staleness(self):
+        synced_at = self.last_synced_at()
+        return None if synced_at is None else time.time() - synced_at
+
+    # Reads
+
+    def read_frame(self, sobject):
+        """Return a whole replicated object as a DataFrame, for analytics without API calls."""
+        if sobject not in SNAPSHOT_FIELDS:
+            raise ValueError(f"{sobject} is not part of the snapshot")
+        with closing(self._connect()) as db:
+            return pd.read_sql_query(f"SELECT * FROM {sobject}", db)
+
+    def picklists(self):
+        with closing(self._connect()) as db:
+            return {
+                column: [row[0] for row in db.execute(
+                    f"SELECT DISTINCT {column} FROM Opportunity WHERE {column} IS NOT NULL ORDER BY {column}"
+                )]
+                for column in ("StageName", "Region__c", "Segment__c")
+            }
+
+    def fetch_picker_page(self, filters, cursor=None, page_size=MIN_PAGE_SIZE):
+        # Same contract as opportunity_picker.fetch_picker_page; the cursor is a row offset
+        conditions, params = [], []
+
+        def like(column, value):
+            escaped = value.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+
+        if filters.search.strip():
+            like("o.Name", filters.search)
+        if filters.owner.strip():
+            like("o.Owner_Name", filters.owner)
+        for column, value in (("o.StageName", filters.stage), ("o.Region__c", filters.region),
+                              ("o.Segment__c", filters.segment)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        offset = int(cursor or 0)
+
+        with closing(self._connect()) as db:
+            total = db.execute(f"SELECT COUNT(*) FROM Opportunity o {where}", params).fetchone()[0]
+            rows = db.execute(
+                f"SELECT o.*, a.Name AS Account_Name FROM Opportunity o "
+                f"LEFT JOIN Account a ON a.Id = o.AccountId {where} "
+                f"ORDER BY o.Name, o.Id LIMIT ? OFFSET ?",
+                params + [page_size, offset]
+            ).fetchall()
+
+        records = [dict(row, Account={"Name": row["Account_Name"]}, Owner={"Name": row["Owner_Name"]})
+                   for row in rows]
+        next_offset = offset + len(records)
+        return PickerPage(
+            records=records,
+            next_records_url=str(next_offset) if next_offset < total else None,
+            total_size=total,
+        )
+
+    def load_opportunity_details(self, opportunity_id):
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM Opportunity WHERE Id = ?", (opportunity_id,)).fetchone()
+            if row is None:
+                raise LookupError(f"Opportunity {opportunity_id} is not in the local snapshot")
+            opportunity = dict(row)
+            account = db.execute("SELECT * FROM Account WHERE Id = ?", (opportunity["AccountId"],)).fetchone()
+            opportunity["Account"] = dict(account) if account else {}
+
+            # Only the latest Task and Event are needed for the Recent Activity section
+            activity_query = "SELECT * FROM {} WHERE WhatId = ? ORDER BY ActivityDate IS NULL, ActivityDate DESC LIMIT 1"
+            tasks = [dict(r) for r in db.execute(activity_query.format("Task"), (opportunity_id,))]
+            events = [dict(r) for r in db.execute(activity_query.format("Event"), (opportunity_id,))]
+
+            contacts = [dict(r) for r in db.execute(
+                "SELECT * FROM Contact WHERE AccountId = ? ORDER BY rowid", (opportunity["AccountId"],))]
+
+        return build_opportunity_details(opportunity, tasks, events, contacts)
+
+    def stage_summary(self, account_id, opportunity_id):
+        # Same contract as account_opportunities.stage_summary
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT StageName, COUNT(Id) AS deals, SUM(Amount) AS amount FROM Opportunity "
+                "WHERE AccountId = ? AND Id != ? GROUP BY StageName ORDER BY deals DESC",
+                (account_id, opportunity_id)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def fetch_account_opportunities_page(self, account_id, opportunity_id, cursor=None, page_size=MIN_PAGE_SIZE):
+        # Same contract as account_opportunities.fetch_account_opportunities_page; the cursor is a row offset
+        offset = int(cursor or 0)
+        with closing(self._connect()) as db:
+            total = db.execute("SELECT COUNT(*) FROM Opportunity WHERE AccountId = ? AND Id != ?",
+                               (account_id, opportunity_id)).fetchone()[0]
+            records = [dict(r) for r in db.execute(
+                "SELECT Id, Name, CloseDate, StageName, Amount FROM Opportunity WHERE AccountId = ? AND Id != ? "
+                "ORDER BY CloseDate IS NULL, CloseDate DESC, Id LIMIT ? OFFSET ?",
+                (account_id, opportunity_id, page_size, offset))]
+        next_offset = offset + len(records)
+        return PickerPage(
+            records=records,
+            next_records_url=str(next_offset) if next_offset < total else None,
+            total_size=total,
+        )
@@ -0,0 +1,193 @@
+import threading
+import time
+
+import pytest
+from simple_salesforce.exceptions import (SalesforceGeneralError, SalesforceMalformedRequest,
+                                          SalesforceRefusedRequest)
+
+from api_scheduler import ApiOverloaded, ApiScheduler, TokenBucket, is_transient, wait_for_budget
+
+
+def refused(code, message):
+    return SalesforceRefusedRequest("url", 403, "query", [{"errorCode": code, "message": message}])
+
+
+CONCURRENT_LIMIT = refused("REQUEST_LIMIT_EXCEEDED", "ConcurrentPerOrgLongTxn Limit exceeded")
+DAILY_LIMIT = refused("REQUEST_LIMIT_EXCEEDED", "TotalRequests Limit exceeded.")
+UNAVAILABLE = SalesforceGeneralError("url", 503, "query", "Service Unavailable")
+LOCKED_ROW = SalesforceGeneralError("url", 500, "query",
+                                    [{"errorCode": "UNABLE_TO_LOCK_ROW", "message": "unable to obtain lock"}])
+
+
+def failing(*errors, result="done"):
+    # An operation that raises ``errors`` one after the other, then returns ``result``
+    errors = list(errors)
+    calls = []
+
+    def operation():
+        calls.append(time.monotonic())
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    operation.calls = calls
+    return operation
+
+
+def fast_scheduler(**kwargs):
+    return ApiScheduler(**{"base_delay": 0.01, "max_delay": 0.02, **kwargs})
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate_per_minute=60, burst=2)
+    now = bucket.updated
+    bucket.tokens = 0
+    assert bucket.wait_time(now) == pytest.approx(1.0)
+    assert bucket.wait_time(now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(now + 10) == 0
+    assert bucket.tokens == 2
+
+
+def test_user_budget_sheds_only_that_user():
+    scheduler = ApiScheduler(user_calls_per_minute=60, user_burst=3, max_wait=0.2)
+    results = []
+    for _ in range(5):
+        try:
+            results.append(scheduler.run(lambda: "ok", user="alice"))
+        except ApiOverloaded:
+            results.append("shed")
+
+    assert results == ["ok", "ok", "ok", "shed", "shed"]
+    assert scheduler.run(lambda: "ok", user="bob") == "ok"
+    assert scheduler.stats()["shed"] == 2
+
+
+def test_global_budget_is_shared_by_all_users():
+    scheduler = ApiScheduler(calls_per_minute=60, burst=2, max_wait=0.2)
+    scheduler.run(lambda: None, user="alice")
+    scheduler.run(lambda: None, user="bob")
+    with pytest.raises(ApiOverloaded):
+        scheduler.run(lambda: None, user="carol")
+
+
+def test_wait_for_budget_waits_instead_of_shedding():
+    scheduler = ApiScheduler(user_calls_per_minute=120, user_burst=1, max_wait=0)
+    scheduler.run(lambda: None, user="sync")
+    started = time.monotonic()
+    with wait_for_budget():
+        assert scheduler.run(lambda: "ok", user="sync") == "ok"
+    assert time.monotonic() - started == pytest.approx(0.5, abs=0.2)
+
+
+def test_concurrency_is_capped():
+    scheduler = ApiScheduler(max_concurrent=2)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def operation():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    threads = [threading.Thread(target=scheduler.run, args=(operation, f"user{i}")) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+
+def test_a_free_slot_goes_to_a_caller_that_can_use_it():
+    scheduler = ApiScheduler(max_concurrent=1, user_calls_per_minute=60, user_burst=1, max_wait=2)
+    scheduler.run(lambda: None, user="alice")  # alice's bucket is empty for the next second
+    started = threading.Event()
+    admitted = {}
+
+    def hold_the_slot():
+        started.set()
+        time.sleep(0.2)
+
+    def call(user):
+        begin = time.monotonic()
+        scheduler.run(lambda: None, user=user)
+        admitted[user] = time.monotonic() - begin
+
+    holder = threading.Thread(target=scheduler.run, args=(hold_the_slot, "carol"))
+    holder.start()
+    started.wait()
+    waiters = [threading.Thread(target=call, args=(user,)) for user in ("alice", "bob")]
+    for thread in waiters:
+        thread.start()
+        time.sleep(0.02)
+    for thread in [holder, *waiters]:
+        thread.join()
+
+    # bob runs as soon as carol's slot is free, even if alice, who can't run yet, is woken too
+    assert admitted["bob"] < 0.5
+    assert admitted["alice"] > 0.5
+
+
+def test_transient_errors_are_retried_with_growing_delays():
+    scheduler = ApiScheduler(base_delay=0.05, max_delay=1)
+    operation = failing(UNAVAILABLE, UNAVAILABLE, UNAVAILABLE)
+    assert scheduler.run(operation, user="alice") == "done"
+    assert len(operation.calls) == 4
+    assert scheduler.stats()["retries"] == 3
+
+
+def test_retries_give_up_with_api_overloaded():
+    scheduler = fast_scheduler(max_retries=2)
+    operation = failing(*[UNAVAILABLE] * 5)
+    with pytest.raises(ApiOverloaded) as raised:
+        scheduler.run(operation, user="alice")
+    assert raised.value.__cause__ is UNAVAILABLE
+    assert len(operation.calls) == 3
+
+
+def test_other_errors_are_not_retried():
+    malformed = SalesforceMalformedRequest("url", 400, "query", [{"errorCode": "MALFORMED_QUERY", "message": ""}])
+    operation = failing(malformed)
+    with pytest.raises(SalesforceMalformedRequest):
+        fast_scheduler().run(operation, user="alice")
+    assert len(operation.calls) == 1
+
+
+def test_calls_that_may_change_data_are_not_retried():
+    operation = failing(UNAVAILABLE)
+    with pytest.raises(SalesforceGeneralError):
+        fast_scheduler().run(operation, user="alice", retry=False)
+    assert len(operation.calls) == 1
+
+
+def test_limit_errors_pause_every_caller():
+    scheduler = fast_scheduler()
+    assert scheduler.run(failing(CONCURRENT_LIMIT), user="alice") == "done"
+    assert scheduler._paused_until > 0
+
+
+def test_other_transient_errors_dont_pause():
+    scheduler = fast_scheduler()
+    assert scheduler.run(failing(LOCKED_ROW), user="alice") == "done"
+    assert scheduler._paused_until == 0
+
+
+def test_daily_limit_is_shed_without_retrying():
+    scheduler = ApiScheduler(max_delay=10, max_wait=1)
+    operation = failing(DAILY_LIMIT)
+    with pytest.raises(ApiOverloaded, match="daily API limit"):
+        scheduler.run(operation, user="alice")
+    assert len(operation.calls) == 1
+    # Everyone else backs off too, longer than they are willing to wait
+    with pytest.raises(ApiOverloaded):
+        scheduler.run(lambda: None, user="bob")
+
+
+def test_transient_errors():
+    assert is_transient(CONCURRENT_LIMIT)
+    assert is_transient(UNAVAILABLE)
+    assert is_transient(LOCKED_ROW)
+    assert not is_transient(DAILY_LIMIT)
+    assert not is_transient(ValueError("bad input"))
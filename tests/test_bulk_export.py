@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from bulk_export import OPEN_PIPELINE_QUERY, RESULT_RETENTION, BulkQueryExport
+
+CSV = (b'"Id","Name","AccountId","OwnerId","StageName","Region__c","Segment__c","CloseDate","Amount",'
+       b'"Probability","IsClosed"\n'
+       b'"006000000000001","Deal","001000000000001","005000000000001","Prospecting","EMEA","SMB",'
+       b'"2026-11-30","1000.0","10.0","false"\n')
+
+
+class Response:
+    def __init__(self, data=None, content=b"", headers=None):
+        self.data, self.content, self.headers = data, content, headers or {}
+
+    def json(self):
+        return self.data
+
+
+class BulkConnection:
+    """Answers the Bulk API 2.0 query calls with one result chunk per job."""
+
+    def __init__(self, job_state="JobComplete"):
+        self.job_state = job_state
+        self.jobs = 0
+
+    def request(self, method, path, **kwargs):
+        if method == "POST":
+            self.jobs += 1
+            return Response({"id": f"750{self.jobs:012d}"})
+        if path.endswith("/results"):
+            return Response(content=CSV, headers={"Sforce-Locator": "null"})
+        return Response({"state": self.job_state, "numberRecordsProcessed": 1, "errorMessage": "boom"})
+
+
+def job_ids(tmp_path):
+    return sorted(path.name for path in tmp_path.iterdir())
+
+
+def test_a_finished_export_replaces_the_older_ones(tmp_path):
+    export = BulkQueryExport(BulkConnection(), tmp_path)
+    first = export.run(OPEN_PIPELINE_QUERY)
+    second = export.run(OPEN_PIPELINE_QUERY)
+
+    assert job_ids(tmp_path) == [second["job_id"]]
+    assert export.latest()["job_id"] == second["job_id"]
+    assert first["job_id"] != second["job_id"]
+    assert len(export.read(second["job_id"])) == 1
+
+
+def test_interrupted_exports_expire_with_their_results(tmp_path):
+    export = BulkQueryExport(BulkConnection(), tmp_path)
+    expired, recent = export.start(OPEN_PIPELINE_QUERY), export.start(OPEN_PIPELINE_QUERY)
+    state = export._read_state(expired)
+    state["created_at"] = time.time() - RESULT_RETENTION - 60
+    export._write_state(state)
+
+    assert [state["job_id"] for state in export.pending()] == [recent]
+    finished = export.run(OPEN_PIPELINE_QUERY)
+    # The recent one can still be resumed, so it's kept
+    assert job_ids(tmp_path) == sorted([recent, finished["job_id"]])
+
+
+def test_failed_jobs_are_dropped(tmp_path):
+    export = BulkQueryExport(BulkConnection(job_state="Failed"), tmp_path)
+    with pytest.raises(RuntimeError, match="failed: boom"):
+        export.run(OPEN_PIPELINE_QUERY)
+    assert export.pending() == []
+    assert job_ids(tmp_path) == []
@@ -0,0 +1,92 @@
+import pickle
+
+from record_cache import RecordCache
+
+
+class Loader:
+    """``load`` and ``revalidate`` callables over a record whose stamp can be moved."""
+
+    def __init__(self, value="v1", stamp=1):
+        self.value, self.stamp = value, stamp
+        self.loads = self.revalidations = 0
+
+    def load(self):
+        self.loads += 1
+        return self.value, self.stamp
+
+    def revalidate(self):
+        self.revalidations += 1
+        return self.stamp
+
+
+def expire(cache, key, validated_seconds_ago, fetched_seconds_ago=None):
+    entry = cache._entries[key]
+    entry.validated_at -= validated_seconds_ago
+    entry.fetched_at -= validated_seconds_ago if fetched_seconds_ago is None else fetched_seconds_ago
+
+
+def test_fresh_entries_are_served_without_revalidating():
+    cache, loader = RecordCache(ttl=60), Loader()
+    assert cache.get_or_load("k", loader.load, loader.revalidate) == "v1"
+    assert cache.get_or_load("k", loader.load, loader.revalidate) == "v1"
+    assert (loader.loads, loader.revalidations) == (1, 0)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_expired_entries_with_the_same_stamp_are_kept():
+    cache, loader = RecordCache(ttl=60), Loader()
+    cache.get_or_load("k", loader.load, loader.revalidate)
+    expire(cache, "k", 120)
+
+    assert cache.get_or_load("k", loader.load, loader.revalidate) == "v1"
+    assert (loader.loads, loader.revalidations) == (1, 1)
+    # Revalidating makes the entry fresh again
+    assert cache.get_or_load("k", loader.load, loader.revalidate) == "v1"
+    assert loader.revalidations == 1
+
+
+def test_expired_entries_with_a_new_stamp_are_reloaded():
+    cache, loader = RecordCache(ttl=60), Loader()
+    cache.get_or_load("k", loader.load, loader.revalidate)
+    expire(cache, "k", 120)
+    loader.value, loader.stamp = "v2", 2
+
+    assert cache.get_or_load("k", loader.load, loader.revalidate) == "v2"
+    assert (loader.loads, loader.revalidations) == (2, 1)
+
+
+def test_entries_past_max_age_are_reloaded_without_revalidating():
+    cache, loader = RecordCache(ttl=60, max_age=600), Loader()
+    cache.get_or_load("k", loader.load, loader.revalidate)
+    expire(cache, "k", 120, fetched_seconds_ago=1200)
+
+    cache.get_or_load("k", loader.load, loader.revalidate)
+    assert (loader.loads, loader.revalidations) == (2, 0)
+
+
+def test_least_recently_used_entries_are_evicted():
+    size = len(pickle.dumps("x" * 100, protocol=pickle.HIGHEST_PROTOCOL))
+    cache = RecordCache(max_bytes=2 * size)
+    cache.put("a", "x" * 100)
+    cache.put("b", "x" * 100)
+    cache.get_or_load("a", lambda: ("unused", None))  # a is now the most recently used
+    cache.put("c", "x" * 100)
+
+    assert cache.peek("a") is not None and cache.peek("c") is not None
+    assert cache.peek("b") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 2 * size
+
+
+def test_values_too_big_for_the_cache_are_not_cached():
+    cache = RecordCache(max_bytes=10)
+    cache.put("k", "x" * 100)
+    assert cache.peek("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_peek_returns_stale_values_without_counting():
+    cache = RecordCache(ttl=0)
+    cache.put("k", "old")
+    assert cache.peek("k") == "old"
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_concurrently(single_flight, key, load, callers, **kwargs):
+    # Start ``callers`` threads calling do() while the first one is still loading
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(single_flight.do(key, load, **kwargs))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    threads[0].start()
+    time.sleep(0.05)
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def slow(result=None, error=None, seconds=0.2):
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(seconds)
+        if error is not None:
+            raise error
+        return result
+
+    load.calls = calls
+    return load
+
+
+def test_concurrent_callers_share_one_call():
+    single_flight = SingleFlight()
+    load = slow(result={"Id": "006"})
+    results, errors = run_concurrently(single_flight, "key", load, callers=5)
+
+    assert not errors
+    assert len(load.calls) == 1
+    assert [result for result, _ in results] == [{"Id": "006"}] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert single_flight.stats() == {"calls": 1, "deduplicated": 4, "in_flight": 0}
+
+
+def test_errors_reach_every_caller():
+    single_flight = SingleFlight()
+    error = LookupError("not found")
+    load = slow(error=error)
+    results, errors = run_concurrently(single_flight, "key", load, callers=3)
+
+    assert not results
+    assert errors == [error] * 3
+    assert len(load.calls) == 1
+    # A failed call isn't remembered
+    assert single_flight.do("key", lambda: "retried") == ("retried", False)
+
+
+def test_waiting_callers_start_over_together_on_retry_on_errors():
+    single_flight = SingleFlight()
+    leader_error = OverflowError("shed")
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.2)
+        if len(calls) == 1:
+            raise leader_error
+        return "retried"
+
+    results, errors = run_concurrently(single_flight, "key", load, callers=20, retry_on=OverflowError)
+    assert errors == [leader_error]
+    # One of the waiting callers ran the call again, the other 18 waited for it
+    assert len(calls) == 2
+    assert sorted(results) == [("retried", False)] + [("retried", True)] * 18
+    assert single_flight.stats() == {"calls": 2, "deduplicated": 18, "in_flight": 0}
+
+
+def test_waiting_callers_give_up_after_the_timeout():
+    single_flight = SingleFlight()
+    results, errors = run_concurrently(single_flight, "key", slow(result="late", seconds=0.5), callers=2,
+                                       timeout=0.1)
+    assert results == [("late", False)]
+    assert len(errors) == 1 and isinstance(errors[0], TimeoutError)
+
+
+def test_different_keys_dont_wait_for_each_other():
+    single_flight = SingleFlight()
+    assert single_flight.do("a", lambda: 1) == (1, False)
+    assert single_flight.do("b", lambda: 2) == (2, False)
+    with pytest.raises(KeyError):
+        single_flight.do("c", lambda: {}["missing"])
+    assert single_flight.stats()["in_flight"] == 0
@@ -0,0 +1,61 @@
+import re
+
+from snapshot_store import SnapshotStore
+
+OPPORTUNITY_ID = "006000000000001"
+
+
+def task(task_id, subject, modstamp, what_type="Opportunity", deleted=False):
+    return {"Id": task_id, "WhatId": OPPORTUNITY_ID if what_type == "Opportunity" else "500000000000001",
+            "What": {"Type": what_type}, "Subject": subject, "Status": "Open", "ActivityDate": "2026-10-01",
+            "Description": None, "CreatedDate": "2026-10-01T00:00:00.000+0000", "SystemModstamp": modstamp,
+            "IsDeleted": deleted}
+
+
+class SnapshotConnection:
+    """Answers the snapshot's queryAll calls from ``records`` per object, like Salesforce would."""
+
+    def __init__(self):
+        self.records = {"Task": []}
+        self.queries = []
+
+    def query(self, soql, include_deleted=False):
+        self.queries.append(soql)
+        sobject = re.search(r"FROM (\w+)", soql).group(1)
+        records = self.records.get(sobject, [])
+        if "What.Type = 'Opportunity'" in soql:
+            records = [r for r in records if r["What"]["Type"] == "Opportunity"]
+        return {"records": records, "done": True}
+
+
+def tasks(store):
+    return dict(store.read_frame("Task")[["Id", "Subject"]].itertuples(index=False))
+
+
+def test_only_real_changes_are_counted(tmp_path):
+    store, connection = SnapshotStore(str(tmp_path / "snapshot.sqlite")), SnapshotConnection()
+    connection.records["Task"] = [task("00T1", "Call", "2026-10-01T10:00:00.000+0000"),
+                                  task("00T2", "Demo", "2026-10-01T10:00:00.000+0000")]
+    assert store.sync(connection) == 2
+
+    # Both are read again in the overlap window, but nothing changed
+    assert store.sync(connection) == 0
+
+    connection.records["Task"][1] = task("00T2", "Demo done", "2026-10-01T10:01:00.000+0000")
+    assert store.sync(connection) == 1
+    assert tasks(store) == {"00T1": "Call", "00T2": "Demo done"}
+
+
+def test_activities_moved_off_an_opportunity_are_removed(tmp_path):
+    store, connection = SnapshotStore(str(tmp_path / "snapshot.sqlite")), SnapshotConnection()
+    connection.records["Task"] = [task("00T1", "Call", "2026-10-01T10:00:00.000+0000"),
+                                  task("00T2", "Case follow-up", "2026-10-01T10:00:00.000+0000", what_type="Case")]
+    store.sync(connection)
+    # The full load only asks for the activities of Opportunities
+    assert tasks(store) == {"00T1": "Call"}
+
+    connection.records["Task"] = [task("00T1", "Call", "2026-10-01T10:05:00.000+0000", what_type="Case")]
+    assert store.sync(connection) == 1
+    # The delta sync asks for every changed activity, wherever it's attached now
+    assert "What.Type = 'Opportunity'" not in [q for q in connection.queries if "FROM Task" in q][-1]
+    assert tasks(store) == {}